@@ -0,0 +1,434 @@
+import argparse
+import asyncio
+import base64
+import json
+import re
+import time
+from collections import namedtuple
+from concurrent.futures import ThreadPoolExecutor
+from http import HTTPStatus
+from urllib.parse import urlsplit, parse_qsl, urlencode
+from task_repository import (DATABASE, TASK_FIELDS, PATCH_FIELDS, INSERT_TASK_ROW_SQL, connect, setup_database, get_task,
+                             list_categories, occurrences_between, keyset_condition, transaction, encode_row, add_tasks,
+                             update_task, complete_tasks, delete_tasks, date_argument, list_query, task_json, task_row)
+
+# Headless HTTP/JSON API over todo.db, so scripts and dashboards can use the
+# tasks without a GUI. It listens on localhost only unless told otherwise.
+#
+#   GET    /tasks                  filter with priority, category, completed, due_date,
+#                                  due_from, due_to, overdue=yes and q (search); a,b matches any of
+#                                  the values and priority!=Low excludes them;
+#                                  sort=due_date,-priority; page with limit and the
+#                                  returned cursor
+#   GET    /search?q=...           like /tasks, best match first
+#   POST   /tasks                  add a task; returns it with 201
+#   GET    /tasks/<id>
+#   PATCH  /tasks/<id>             change some fields of a task
+#   DELETE /tasks/<id>
+#   POST   /tasks/<id>/complete    returns the ids of tasks added for repeating ones
+#   POST   /tasks/bulk             {"add": [...], "complete": [ids], "delete": [ids]}, all in one transaction
+#   GET    /categories
+#   GET    /occurrences?from=YYYY-MM-DD&to=YYYY-MM-DD
+#
+# GET responses carry an ETag built from PRAGMA data_version; sending it back
+# in If-None-Match gets 304 Not Modified, without running the query, until
+# someone changes the database.
+
+HOST = "127.0.0.1"
+PORT = 8765
+
+# Read-only connections for queries; writes share one more connection
+POOL_SIZE = 4
+
+# Tasks per page of GET /tasks
+DEFAULT_LIMIT = 100
+MAX_LIMIT = 1000
+
+MAX_LINE_SIZE = 16 * 1024
+MAX_HEADERS = 100
+MAX_BODY_SIZE = 16 * 1024 * 1024
+KEEP_ALIVE_TIMEOUT = 15
+MAX_OCCURRENCE_DAYS = 366
+
+# Arguments of GET /tasks handled here rather than by list_query
+PAGE_ARGUMENTS = {"limit", "cursor"}
+
+Request = namedtuple("Request", ["method", "path", "args", "headers", "body", "keep_alive"])
+
+
+class ApiError(Exception):
+    def __init__(self, status, message):
+        super().__init__(message)
+        self.status = status
+
+
+def task_ids(values, name):
+    if not isinstance(values, list) or not all(isinstance(value, int) for value in values):
+        raise ApiError(HTTPStatus.BAD_REQUEST, f"{name} must be a list of task ids")
+    return values
+
+
+def encode_cursor(key):
+    return base64.urlsafe_b64encode(json.dumps(list(key)).encode()).decode().rstrip("=")
+
+
+def decode_cursor(token, size):
+    try:
+        key = json.loads(base64.urlsafe_b64decode(token + "=" * (-len(token) % 4)))
+    except ValueError:
+        key = None
+    if not isinstance(key, list) or len(key) != size or any(isinstance(value, (dict, list)) for value in key):
+        raise ApiError(HTTPStatus.BAD_REQUEST, "invalid cursor")
+    return key
+
+
+# ================= Database jobs =================
+def fetch_all(conn, query, params):
+    return conn.execute(query, params).fetchall()
+
+
+def add_task_job(conn, row):
+    with transaction(conn):
+        cursor = conn.execute(INSERT_TASK_ROW_SQL, encode_row(conn, row, {}))
+    return get_task(conn, cursor.lastrowid)
+
+
+def patch_task_job(conn, task_id, data):
+    current = get_task(conn, task_id)
+    if current is None:
+        return None
+    task, due_date, due_time, priority, category, _, recurrence, notes = task_row(data, current, PATCH_FIELDS)
+    update_task(conn, task_id, task, due_date, due_time, priority, category, recurrence, notes)
+    return get_task(conn, task_id)
+
+
+def complete_task_job(conn, task_id):
+    if get_task(conn, task_id) is None:
+        return None
+    return complete_tasks(conn, [task_id])
+
+
+def bulk_job(conn, rows, complete_ids, delete_ids):
+    with transaction(conn):
+        add_tasks(conn, rows)
+        next_ids = complete_tasks(conn, complete_ids)
+        deleted = delete_tasks(conn, delete_ids)
+    return {"added": len(rows), "next_ids": next_ids, "deleted": deleted}
+
+
+# ================= Connection pool =================
+# Queries run on POOL_SIZE read-only connections and writes take turns on a
+# single writer, so concurrent requests never wait on SQLite's write lock
+# among themselves. Jobs run on a thread pool, off the event loop.
+class ConnectionPool:
+    def __init__(self, database=DATABASE, size=POOL_SIZE):
+        self.database = database
+        self.size = size
+        self.executor = ThreadPoolExecutor(max_workers=size + 1, thread_name_prefix="todo-db")
+        self.readers = asyncio.Queue()
+        self.write_lock = asyncio.Lock()
+        self.writer = None
+        self.watcher = None
+        self.fts_enabled = False
+        # Part of every ETag, as data_version only counts within one connection
+        self.instance = format(time.time_ns(), "x")
+
+    def open(self):
+        self.writer = connect(self.database, check_same_thread=False)
+        self.fts_enabled = setup_database(self.writer)
+        # transaction() then nests as savepoints; write() commits each request
+        self.writer.write_behind = True
+        for _ in range(self.size):
+            self.readers.put_nowait(connect(self.database, read_only=True, check_same_thread=False))
+        # Never used for anything else, so its data_version changes exactly
+        # when any connection, ours or another program's, commits
+        self.watcher = connect(self.database, read_only=True)
+
+    async def read(self, func, *args):
+        conn = await self.readers.get()
+        try:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, func, conn, *args)
+        finally:
+            self.readers.put_nowait(conn)
+
+    async def write(self, func, *args):
+        async with self.write_lock:
+            return await asyncio.get_running_loop().run_in_executor(self.executor, self.run_write, func, args)
+
+    def run_write(self, func, args):
+        # A request's writes are committed, or rolled back, together
+        try:
+            result = func(self.writer, *args)
+            self.writer.commit()
+        except BaseException:
+            self.writer.rollback()
+            raise
+        return result
+
+    def etag(self):
+        version = self.watcher.execute("PRAGMA data_version").fetchone()[0]
+        return f'"{self.instance}-{version}"'
+
+    def close(self):
+        self.executor.shutdown(wait=True)
+        while not self.readers.empty():
+            self.readers.get_nowait().close()
+        for conn in (self.writer, self.watcher):
+            if conn is not None:
+                conn.close()
+
+
+# ================= HTTP =================
+async def read_request(reader):
+    # Returns the next Request, or None once the client hangs up
+    line = await reader.readline()
+    if not line.strip():
+        return None
+    try:
+        method, target, version = line.decode("latin-1").split()
+    except ValueError:
+        raise ApiError(HTTPStatus.BAD_REQUEST, "malformed request line") from None
+    headers = {}
+    while True:
+        line = await reader.readline()
+        if line in (b"\r\n", b"\n", b""):
+            break
+        name, sep, value = line.decode("latin-1").partition(":")
+        if not sep or len(headers) >= MAX_HEADERS:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "malformed headers")
+        headers[name.strip().lower()] = value.strip()
+
+    if "transfer-encoding" in headers:
+        raise ApiError(HTTPStatus.LENGTH_REQUIRED, "send the body with Content-Length")
+    length = headers.get("content-length", "0")
+    if not length.isdigit():
+        raise ApiError(HTTPStatus.BAD_REQUEST, "invalid Content-Length")
+    if int(length) > MAX_BODY_SIZE:
+        raise ApiError(HTTPStatus.REQUEST_ENTITY_TOO_LARGE, "request body is too large")
+    body = await reader.readexactly(int(length))
+
+    connection = headers.get("connection", "").lower()
+    keep_alive = connection != "close" if version == "HTTP/1.1" else connection == "keep-alive"
+    url = urlsplit(target)
+    return Request(method.upper(), url.path.rstrip("/") or "/", dict(parse_qsl(url.query, keep_blank_values=True)),
+                   headers, body, keep_alive)
+
+
+async def send_response(writer, status, payload=None, headers=None, keep_alive=True):
+    status = HTTPStatus(status)
+    body = b""
+    lines = [f"HTTP/1.1 {status.value} {status.phrase}"]
+    if payload is not None:
+        body = json.dumps(payload).encode("utf-8")
+        lines.append("Content-Type: application/json; charset=utf-8")
+    lines.append(f"Content-Length: {len(body)}")
+    lines.append("Connection: " + ("keep-alive" if keep_alive else "close"))
+    lines.extend(f"{name}: {value}" for name, value in (headers or {}).items())
+    writer.write(("\r\n".join(lines) + "\r\n\r\n").encode("latin-1") + body)
+    await writer.drain()
+
+
+class TaskApi:
+    def __init__(self, pool):
+        self.pool = pool
+        self.routes = [
+            ("GET", re.compile(r"/tasks"), self.list_tasks),
+            ("POST", re.compile(r"/tasks"), self.add_task),
+            ("GET", re.compile(r"/search"), self.search_tasks),
+            ("POST", re.compile(r"/tasks/bulk"), self.bulk),
+            ("GET", re.compile(r"/tasks/(\d+)"), self.get_task),
+            ("PATCH", re.compile(r"/tasks/(\d+)"), self.patch_task),
+            ("DELETE", re.compile(r"/tasks/(\d+)"), self.delete_task),
+            ("POST", re.compile(r"/tasks/(\d+)/complete"), self.complete_task),
+            ("GET", re.compile(r"/categories"), self.list_categories),
+            ("GET", re.compile(r"/occurrences"), self.list_occurrences)
+        ]
+
+    async def handle_client(self, reader, writer):
+        # One connection; requests on it are answered in turn (keep-alive)
+        try:
+            while True:
+                try:
+                    request = await asyncio.wait_for(read_request(reader), KEEP_ALIVE_TIMEOUT)
+                except ApiError as exc:
+                    await send_response(writer, exc.status, {"error": str(exc)}, keep_alive=False)
+                    break
+                except ValueError:
+                    # A line longer than MAX_LINE_SIZE
+                    await send_response(writer, HTTPStatus.REQUEST_HEADER_FIELDS_TOO_LARGE,
+                                        {"error": "request line or header is too long"}, keep_alive=False)
+                    break
+                if request is None:
+                    break
+                status, payload, headers = await self.dispatch(request)
+                await send_response(writer, status, payload, headers, request.keep_alive)
+                if not request.keep_alive:
+                    break
+        except (asyncio.TimeoutError, asyncio.IncompleteReadError, ConnectionError):
+            pass
+        finally:
+            writer.close()
+
+    async def dispatch(self, request):
+        allowed = []
+        for method, pattern, handler in self.routes:
+            match = pattern.fullmatch(request.path)
+            if match is None:
+                continue
+            if method != request.method:
+                allowed.append(method)
+                continue
+            try:
+                return await handler(request, *match.groups())
+            except ApiError as exc:
+                return exc.status, {"error": str(exc)}, None
+            except ValueError as exc:
+                return HTTPStatus.BAD_REQUEST, {"error": str(exc)}, None
+            except Exception as exc:
+                return HTTPStatus.INTERNAL_SERVER_ERROR, {"error": f"{type(exc).__name__}: {exc}"}, None
+        if allowed:
+            return HTTPStatus.METHOD_NOT_ALLOWED, {"error": "method not allowed"}, {"Allow": ", ".join(allowed)}
+        return HTTPStatus.NOT_FOUND, {"error": "not found"}, None
+
+    async def conditional(self, request, fetch):
+        # The version is read before the query runs, so a change made while it
+        # runs gives the next request a new ETag rather than a stale match
+        etag = self.pool.etag()
+        sent = {tag.strip() for tag in request.headers.get("if-none-match", "").split(",")}
+        if etag in sent or "*" in sent:
+            return HTTPStatus.NOT_MODIFIED, None, {"ETag": etag}
+        status, payload = await fetch()
+        return status, payload, {"ETag": etag, "Cache-Control": "no-cache"} if status == HTTPStatus.OK else None
+
+    def json_body(self, request):
+        try:
+            return json.loads(request.body or b"null")
+        except ValueError:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "request body is not valid JSON") from None
+
+    async def list_tasks(self, request, best_match=False):
+        # list_query raises ValueError for bad arguments, which dispatch turns into a 400
+        args = {name: value for name, value in request.args.items() if name not in PAGE_ARGUMENTS}
+        query, conditions, params, order = list_query(args, self.pool.fts_enabled, best_match)
+        limit = request.args.get("limit", str(DEFAULT_LIMIT))
+        if not limit.isdigit() or not 1 <= int(limit) <= MAX_LIMIT:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"limit must be between 1 and {MAX_LIMIT}")
+        limit = int(limit)
+        if "cursor" in request.args:
+            condition, key_params = keyset_condition(order, decode_cursor(request.args["cursor"], len(order)), False)
+            conditions.append(condition)
+            params.extend(key_params)
+        if conditions:
+            query += " WHERE " + " AND ".join(conditions)
+        query += " ORDER BY " + ", ".join(f"{expr} {'DESC' if reverse else 'ASC'}" for expr, reverse in order)
+        query += " LIMIT ?"
+        params.append(limit + 1)  # one extra row tells whether there is another page
+
+        async def fetch():
+            rows = await self.pool.read(fetch_all, query, params)
+            page = {"tasks": [task_json(row) for row in rows[:limit]], "next": None}
+            if len(rows) > limit:
+                args = dict(request.args, cursor=encode_cursor(rows[limit - 1][len(TASK_FIELDS):]))
+                page["next"] = f"{request.path}?{urlencode(args)}"
+            return HTTPStatus.OK, page
+        return await self.conditional(request, fetch)
+
+    async def search_tasks(self, request):
+        if not request.args.get("q", "").strip():
+            raise ApiError(HTTPStatus.BAD_REQUEST, "q is required")
+        return await self.list_tasks(request, best_match=True)
+
+    async def get_task(self, request, task_id):
+        async def fetch():
+            task = await self.pool.read(get_task, int(task_id))
+            if task is None:
+                return HTTPStatus.NOT_FOUND, {"error": "task not found"}
+            return HTTPStatus.OK, task._asdict()
+        return await self.conditional(request, fetch)
+
+    async def add_task(self, request):
+        row = task_row(self.json_body(request))
+        task = await self.pool.write(add_task_job, row)
+        return HTTPStatus.CREATED, task._asdict(), {"Location": f"/tasks/{task.id}"}
+
+    async def patch_task(self, request, task_id):
+        task = await self.pool.write(patch_task_job, int(task_id), self.json_body(request))
+        if task is None:
+            return HTTPStatus.NOT_FOUND, {"error": "task not found"}, None
+        return HTTPStatus.OK, task._asdict(), None
+
+    async def delete_task(self, request, task_id):
+        if await self.pool.write(delete_tasks, [int(task_id)]) == 0:
+            return HTTPStatus.NOT_FOUND, {"error": "task not found"}, None
+        return HTTPStatus.NO_CONTENT, None, None
+
+    async def complete_task(self, request, task_id):
+        next_ids = await self.pool.write(complete_task_job, int(task_id))
+        if next_ids is None:
+            return HTTPStatus.NOT_FOUND, {"error": "task not found"}, None
+        return HTTPStatus.OK, {"next_ids": next_ids}, None
+
+    async def bulk(self, request):
+        data = self.json_body(request)
+        if not isinstance(data, dict) or set(data) - {"add", "complete", "delete"}:
+            raise ApiError(HTTPStatus.BAD_REQUEST, 'expected {"add": [...], "complete": [...], "delete": [...]}')
+        adds = data.get("add", [])
+        if not isinstance(adds, list):
+            raise ApiError(HTTPStatus.BAD_REQUEST, "add must be a list of tasks")
+        rows = []
+        for index, task in enumerate(adds):
+            try:
+                rows.append(task_row(task))
+            except ValueError as exc:
+                raise ApiError(HTTPStatus.BAD_REQUEST, f"add[{index}]: {exc}") from None
+        complete_ids = task_ids(data.get("complete", []), "complete")
+        delete_ids = task_ids(data.get("delete", []), "delete")
+        return HTTPStatus.OK, await self.pool.write(bulk_job, rows, complete_ids, delete_ids), None
+
+    async def list_categories(self, request):
+        async def fetch():
+            categories = await self.pool.read(list_categories, request.args.get("in_use") == "1")
+            return HTTPStatus.OK, [category._asdict() for category in categories]
+        return await self.conditional(request, fetch)
+
+    async def list_occurrences(self, request):
+        if "from" not in request.args or "to" not in request.args:
+            raise ApiError(HTTPStatus.BAD_REQUEST, "from and to are required")
+        first, last = date_argument(request.args, "from"), date_argument(request.args, "to")
+        if not 0 <= (last - first).days < MAX_OCCURRENCE_DAYS:
+            raise ApiError(HTTPStatus.BAD_REQUEST, f"to must be within {MAX_OCCURRENCE_DAYS} days after from")
+
+        async def fetch():
+            found = await self.pool.read(occurrences_between, first, last)
+            return HTTPStatus.OK, [{"date": day.isoformat(), "task": task._asdict()} for day, task in found]
+        return await self.conditional(request, fetch)
+
+
+async def serve(host=HOST, port=PORT, database=DATABASE, pool_size=POOL_SIZE):
+    pool = ConnectionPool(database, pool_size)
+    pool.open()
+    api = TaskApi(pool)
+    server = await asyncio.start_server(api.handle_client, host, port, limit=MAX_LINE_SIZE)
+    print(f"Serving {database} on http://{host}:{port}")
+    try:
+        async with server:
+            await server.serve_forever()
+    finally:
+        pool.close()
+
+
+def main():
+    parser = argparse.ArgumentParser(description="HTTP/JSON API for the To-Do database")
+    parser.add_argument("--host", default=HOST, help=f"address to listen on (default {HOST})")
+    parser.add_argument("--port", type=int, default=PORT)
+    parser.add_argument("--database", default=DATABASE)
+    parser.add_argument("--pool-size", type=int, default=POOL_SIZE, help="read-only connections for queries")
+    args = parser.parse_args()
+    try:
+        asyncio.run(serve(args.host, args.port, args.database, args.pool_size))
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
@@ -1,38 +1,16 @@
 import tkinter as tk
 from tkinter import messagebox, simpledialog
-import sqlite3
-
-# Connect to the database (or create it if it doesn't exist)
-conn = sqlite3.connect("todo.db")
-cursor = conn.cursor()
-
-# Create the tasks table if it doesn't exist
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS tasks (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    task TEXT NOT NULL,
-    completed INTEGER DEFAULT 0
-)
-""")
-conn.commit()
-
-# Add new columns if they don't exist
-cursor.execute("PRAGMA table_info(tasks)")
-columns = cursor.fetchall()
-column_names = [column[1] for column in columns]
-
-if "due_date" not in column_names:
-    cursor.execute("ALTER TABLE tasks ADD COLUMN due_date TEXT")
-if "priority" not in column_names:
-    cursor.execute("ALTER TABLE tasks ADD COLUMN priority TEXT")
-if "category" not in column_names:
-    cursor.execute("ALTER TABLE tasks ADD COLUMN category TEXT")
-conn.commit()
+from db_worker import DatabaseWorker
+import task_repository
 
 # Initialize the main window
 root = tk.Tk()
 root.title("To-Do App")
 
+# All database work runs on a worker thread; results come back via root.after
+db = DatabaseWorker(root, errback=lambda exc: messagebox.showerror("Database Error", str(exc)))
+db.submit(task_repository.setup_database)
+
 # Add a label
 label = tk.Label(root, text="Your To-Do List", font=("Arial", 16))
 label.pack(pady=10)
@@ -49,13 +27,21 @@ task_entry.pack(pady=5)
 due_date_entry = tk.Entry(root, width=40, font=("Arial", 12))
 due_date_entry.pack(pady=5)
 
-# Entry widget for priority
-priority_entry = tk.Entry(root, width=40, font=("Arial", 12))
-priority_entry.pack(pady=5)
+# Menu for priority
+priority_var = tk.StringVar(value="Medium")
+priority_menu = tk.OptionMenu(root, priority_var, *task_repository.PRIORITIES)
+priority_menu.config(width=20, font=("Arial", 12))
+priority_menu.pack(pady=5)
+
+# Menu for category, filled from the categories table
+category_var = tk.StringVar(value="Work")
+category_menu = tk.OptionMenu(root, category_var, "Work")
+category_menu.config(width=20, font=("Arial", 12))
+category_menu.pack(pady=5)
 
-# Entry widget for category
-category_entry = tk.Entry(root, width=40, font=("Arial", 12))
-category_entry.pack(pady=5)
+# Button to add a category
+new_category_button = tk.Button(root, text="New Category", width=20, command=lambda: new_category())
+new_category_button.pack(pady=5)
 
 # Button to add a task
 add_button = tk.Button(root, text="Add Task", width=20, command=lambda: add_task())
@@ -81,31 +67,40 @@ filter_category_button.pack(pady=5)
 def add_task():
     task = task_entry.get()
     due_date = due_date_entry.get()
-    priority = priority_entry.get()
-    category = category_entry.get()
+    priority = priority_var.get()
+    category = category_var.get()
 
     if task:
-        cursor.execute("""
-            INSERT INTO tasks (task, due_date, priority, category)
-            VALUES (?, ?, ?, ?)
-        """, (task, due_date, priority, category))
-        conn.commit()
+        db.submit(task_repository.add_task, task, due_date, priority=priority, category=category,
+                  callback=lambda _: refresh_tasks())
         task_entry.delete(0, tk.END)
         due_date_entry.delete(0, tk.END)
-        priority_entry.delete(0, tk.END)
-        category_entry.delete(0, tk.END)
-        refresh_tasks()
     else:
         messagebox.showwarning("Warning", "Please enter a task.")
 
+# Function to load the categories into the category menu
+def load_categories():
+    db.submit(task_repository.list_categories, callback=show_categories)
+
+def show_categories(categories):
+    menu = category_menu["menu"]
+    menu.delete(0, tk.END)
+    for category in categories:
+        menu.add_command(label=category.name, command=lambda name=category.name: category_var.set(name))
+
+# Function to add a category
+def new_category():
+    name = simpledialog.askstring("New Category", "Category name:")
+    if name and name.strip():
+        db.submit(task_repository.add_category, name, callback=lambda _: [load_categories(), category_var.set(name.strip())])
+
 # Function to mark a task as completed
 def complete_task():
     try:
         selected_task = task_listbox.get(task_listbox.curselection())
         task_id = selected_task.split(":")[0]
-        cursor.execute("UPDATE tasks SET completed = 1 WHERE id = ?", (task_id,))
-        conn.commit()
-        refresh_tasks()
+        db.submit(task_repository.complete_tasks, [task_id],
+                  callback=lambda _: refresh_tasks())
     except IndexError:
         messagebox.showwarning("Warning", "Please select a task to mark as completed.")
 
@@ -114,39 +109,34 @@ def delete_task():
     try:
         selected_task = task_listbox.get(task_listbox.curselection())
         task_id = selected_task.split(":")[0]
-        cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-        conn.commit()
-        refresh_tasks()
+        db.submit(task_repository.delete_tasks, [task_id],
+                  callback=lambda _: refresh_tasks())
     except IndexError:
         messagebox.showwarning("Warning", "Please select a task to delete.")
 
 # Function to refresh the listbox with tasks from the database
 def refresh_tasks():
+    db.submit(task_repository.list_tasks, callback=show_tasks)
+
+# Function to fill the listbox with query results
+def show_tasks(tasks):
     task_listbox.delete(0, tk.END)
-    cursor.execute("SELECT id, task, due_date, priority, category, completed FROM tasks")
-    tasks = cursor.fetchall()
     for task in tasks:
-        task_id, task_text, due_date, priority, category, completed = task
-        status = " (Completed)" if completed else ""
-        task_listbox.insert(tk.END, f"{task_id}: {task_text} | Due: {due_date} | Priority: {priority} | Category: {category}{status}")
+        status = " (Completed)" if task.completed else ""
+        task_listbox.insert(tk.END, f"{task.id}: {task.task} | Due: {task.due_date} | Priority: {task.priority} | Category: {task.category}{status}")
 
 # Function to filter tasks
 def filter_tasks(criteria):
     filter_value = simpledialog.askstring(f"Filter by {criteria.capitalize()}", f"Enter {criteria}:")
     if filter_value:
-        task_listbox.delete(0, tk.END)
-        cursor.execute(f"SELECT id, task, due_date, priority, category, completed FROM tasks WHERE {criteria} = ?", (filter_value,))
-        tasks = cursor.fetchall()
-        for task in tasks:
-            task_id, task_text, due_date, priority, category, completed = task
-            status = " (Completed)" if completed else ""
-            task_listbox.insert(tk.END, f"{task_id}: {task_text} | Due: {due_date} | Priority: {priority} | Category: {category}{status}")
-
-# Load tasks when the app starts
+        db.submit(task_repository.find_tasks, criteria, filter_value, callback=show_tasks)
+
+# Load tasks and categories when the app starts
+load_categories()
 refresh_tasks()
 
 # Save tasks when the app closes
-root.protocol("WM_DELETE_WINDOW", lambda: [conn.close(), root.destroy()])
+root.protocol("WM_DELETE_WINDOW", lambda: [db.close(), root.destroy()])
 
 # Run the application
 root.mainloop()
\ No newline at end of file
@@ -0,0 +1,335 @@
+import argparse
+import json
+import os
+import platform
+import random
+import sqlite3
+import statistics
+import sys
+import tempfile
+import time
+from datetime import date, timedelta
+from task_repository import (TASK_FIELDS, keyset_condition, connect, setup_database, list_tasks, add_task, add_tasks,
+                             update_task, complete_tasks, delete_tasks, export_tasks, import_csv, list_query)
+
+# Benchmarks for the task store on synthetic data. For each size a fresh
+# database is filled with seeded, repeatable tasks, then the core operations
+# are timed: loading, the view queries behind filtering, search and sorting,
+# single edits, and import/export. Results are printed (or saved) as JSON and
+# compared against a stored baseline; a slowdown beyond REGRESSION_THRESHOLD
+# makes the run exit with status 1.
+#
+#   python benchmark.py                      all sizes, compared with the baseline
+#   python benchmark.py --sizes 1k,100k --output results.json
+#   python benchmark.py --save-baseline      record this machine's numbers
+#
+# The baseline only means something on the machine that recorded it; save a
+# new one after changing hardware.
+
+SIZES = {"1k": 1000, "100k": 100_000, "1M": 1_000_000}
+SEED = 20240601
+BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), "benchmark_baseline.json")
+
+# Runs per query, per edit and per bulk load (insert, import, export); the
+# median is what gets compared
+QUERY_REPEATS = 5
+EDIT_REPEATS = 20
+BULK_REPEATS = 3
+
+# A timing counts as a regression when its median is this much slower than the
+# baseline and also slower by more than REGRESSION_MIN_MS (to ignore noise).
+# Timings from a single run, on either side, are reported but never gated.
+REGRESSION_THRESHOLD = 0.25
+REGRESSION_MIN_MS = 1.0
+
+# Rows handed to add_tasks at a time while filling the database
+INSERT_CHUNK_SIZE = 50_000
+
+# Rows per page, as in the GUI and the API
+PAGE_SIZE = 100
+
+# ================= Synthetic data =================
+# Generated dates are spread around this fixed day so runs stay repeatable
+ANCHOR_DATE = date(2026, 1, 5)
+
+PRIORITY_WEIGHTS = {"Low": 30, "Medium": 45, "High": 20, None: 5}
+CATEGORY_WEIGHTS = {"Work": 40, "Personal": 30, "Shopping": 12, "Other": 8, "Health": 4, "Finance": 3,
+                    "Travel": 2, None: 1}
+RECURRENCE_WEIGHTS = {None: 90, "Daily": 2, "Weekdays": 2, "Weekly": 3, "Monthly": 2, "Yearly": 1}
+VERBS = ["Buy", "Call", "Email", "Fix", "Plan", "Review", "Write", "Book", "Pay", "Clean", "Update", "Prepare",
+         "Schedule", "Finish", "Check", "Send", "Order", "Renew", "Submit", "Organize"]
+NOUNS = ["report", "groceries", "dentist", "invoice", "presentation", "car", "taxes", "budget", "flights",
+         "garden", "newsletter", "contract", "laptop", "birthday gift", "meeting notes", "insurance",
+         "kitchen", "passport", "slides", "backup"]
+NOTE_WORDS = ["before", "after", "lunch", "deadline", "ask", "team", "urgent", "maybe", "weekend", "follow",
+              "up", "quarterly", "monthly", "draft", "final", "receipt", "online", "store", "office", "home"]
+
+
+def weighted(rng, weights):
+    return rng.choices(list(weights), list(weights.values()))[0]
+
+
+def generate_tasks(count, seed=SEED):
+    # Yields (task, due_date, due_time, priority, category, completed,
+    # recurrence, notes) rows, the same ones for the same seed
+    rng = random.Random(seed)
+    for number in range(count):
+        task = f"{rng.choice(VERBS)} {rng.choice(NOUNS)}"
+        if rng.random() < 0.3:
+            task += f" #{number}"
+        due_date = due_time = None
+        completed = 0
+        if rng.random() < 0.85:
+            # Most tasks are due within a few weeks either side of the anchor
+            offset = round(rng.triangular(-120, 180, 7))
+            due = ANCHOR_DATE + timedelta(days=offset)
+            due_date = due.isoformat()
+            if rng.random() < 0.6:
+                due_time = f"{rng.randrange(7, 21):02d}:{rng.choice((0, 15, 30, 45)):02d}"
+            completed = int(rng.random() < (0.8 if offset < 0 else 0.1))
+        else:
+            completed = int(rng.random() < 0.3)
+        recurrence = weighted(rng, RECURRENCE_WEIGHTS) if due_date else None
+        notes = None
+        if rng.random() < 0.3:
+            notes = " ".join(rng.choices(NOTE_WORDS, k=rng.randrange(2, 12)))
+        yield (task, due_date, due_time, weighted(rng, PRIORITY_WEIGHTS), weighted(rng, CATEGORY_WEIGHTS),
+               completed, recurrence, notes)
+
+
+def fill_database(conn, count, seed=SEED):
+    rows = generate_tasks(count, seed)
+    while True:
+        chunk = [row for _, row in zip(range(INSERT_CHUNK_SIZE), rows)]
+        if not chunk:
+            break
+        add_tasks(conn, chunk)
+
+
+# ================= Timing =================
+def timed(func, repeats=1, setup=None):
+    # Runs func repeats times; returns a result entry for the JSON output.
+    # setup, if given, runs untimed before each run and func gets its result.
+    times = []
+    result = None
+    for _ in range(repeats):
+        args = (setup(),) if setup else ()
+        started = time.perf_counter()
+        result = func(*args)
+        times.append((time.perf_counter() - started) * 1000)
+    entry = {"median_ms": round(statistics.median(times), 3), "min_ms": round(min(times), 3), "runs": repeats}
+    if isinstance(result, int):
+        entry["rows"] = result
+    elif isinstance(result, list):
+        entry["rows"] = len(result)
+    return entry
+
+
+def view_page(conn, args, fts_enabled, pages=1):
+    # Fetches the first `pages` pages of a view the way the API and GUI
+    # page through it; returns the number of rows read
+    query, conditions, params, order = list_query(args, fts_enabled)
+    fetched = 0
+    key = None
+    for _ in range(pages):
+        page_conditions, page_params = list(conditions), list(params)
+        if key is not None:
+            condition, key_params = keyset_condition(order, key, False)
+            page_conditions.append(condition)
+            page_params.extend(key_params)
+        page_query = query
+        if page_conditions:
+            page_query += " WHERE " + " AND ".join(page_conditions)
+        page_query += " ORDER BY " + ", ".join(f"{expr} {'DESC' if reverse else 'ASC'}" for expr, reverse in order)
+        rows = conn.execute(page_query + " LIMIT ?", page_params + [PAGE_SIZE]).fetchall()
+        fetched += len(rows)
+        if len(rows) < PAGE_SIZE:
+            break
+        key = rows[-1][len(TASK_FIELDS):]
+    return fetched
+
+
+# View queries to time: name -> (GET /tasks arguments, pages read)
+ANCHOR_WEEK = [ANCHOR_DATE.isoformat(), (ANCHOR_DATE + timedelta(days=6)).isoformat()]
+VIEW_CASES = {
+    "view_first_page": ({}, 1),
+    "view_scroll_10_pages": ({}, 10),
+    "filter_priority": ({"priority": "High"}, 1),
+    "filter_category": ({"category": "Shopping"}, 1),
+    "filter_pending": ({"completed": "0"}, 1),
+    "filter_priority_category_pending": ({"priority": "High", "category": "Work", "completed": "0"}, 1),
+    "filter_due_week": ({"due_from": ANCHOR_WEEK[0], "due_to": ANCHOR_WEEK[1]}, 1),
+    "filter_rare_category_pending": ({"category": "Travel", "completed": "0", "priority": "Low"}, 1),
+    "search_common_word": ({"q": "report"}, 1),
+    "search_two_words": ({"q": "review slides"}, 1),
+    "search_rare_prefix": ({"q": "passp"}, 1),
+    "search_notes_filtered": ({"q": "deadline", "completed": "0"}, 1),
+    "sort_due_date": ({"sort": "due_date"}, 1),
+    "sort_priority_due_date": ({"sort": "-priority,due_date"}, 1),
+    "sort_task": ({"sort": "task"}, 1),
+    "sort_category_desc": ({"sort": "-category"}, 1),
+    "sort_due_date_scroll_10_pages": ({"sort": "due_date"}, 10),
+    "sort_filtered_due_date": ({"sort": "due_date", "category": "Work", "completed": "0"}, 1)
+}
+
+
+def empty_database(path):
+    for suffix in ("", "-wal", "-shm"):
+        if os.path.exists(path + suffix):
+            os.remove(path + suffix)
+    conn = connect(path)
+    setup_database(conn)
+    return conn
+
+
+def run_size(label, count, workdir, seed=SEED):
+    results = {}
+    path = os.path.join(workdir, f"bench-{label}.db")
+
+    # Each run fills a new database; the last one is kept for the rest
+    databases = []
+
+    def new_database():
+        if databases:
+            databases.pop().close()
+        databases.append(empty_database(path))
+        return databases[-1]
+
+    results["insert"] = timed(lambda conn: fill_database(conn, count, seed) or count, BULK_REPEATS, new_database)
+    conn = databases[0]
+    fts_enabled = setup_database(conn)
+    conn.execute("ANALYZE")
+    conn.commit()
+
+    results["load_all"] = timed(lambda: list_tasks(conn), QUERY_REPEATS)
+    for name, (args, pages) in VIEW_CASES.items():
+        results[name] = timed(lambda: view_page(conn, args, fts_enabled, pages), QUERY_REPEATS)
+
+    # Single edits, each committed on its own like a click in the GUI
+    rng = random.Random(seed)
+    ids = [row[0] for row in conn.execute("SELECT id FROM tasks ORDER BY random() LIMIT ?", (EDIT_REPEATS * 3,))]
+    edit_ids = iter(ids)
+    results["edit_update"] = timed(lambda: update_task(conn, next(edit_ids), "Edited task", "2026-02-01", "10:30",
+                                                       rng.choice(["Low", "Medium", "High"]), "Work", None,
+                                                       "edited"), EDIT_REPEATS)
+    results["edit_complete"] = timed(lambda: complete_tasks(conn, [next(edit_ids)]), EDIT_REPEATS)
+    results["edit_delete"] = timed(lambda: delete_tasks(conn, [next(edit_ids)]), EDIT_REPEATS)
+    results["edit_add"] = timed(lambda: add_task(conn, "Benchmark task", "2026-02-01", "09:00", "Medium", "Work"),
+                                EDIT_REPEATS)
+
+    csv_path = os.path.join(workdir, f"bench-{label}.csv")
+    results["export_csv"] = timed(lambda: export_tasks(conn, csv_path), BULK_REPEATS)
+    results["export_csv_gz"] = timed(lambda: export_tasks(conn, csv_path + ".gz"), BULK_REPEATS)
+    results["export_jsonl"] = timed(lambda: export_tasks(conn, os.path.join(workdir, f"bench-{label}.jsonl")),
+                                    BULK_REPEATS)
+    conn.close()
+
+    # Import the exported file, each run into a new empty database
+    import_path = os.path.join(workdir, f"bench-{label}-import.db")
+    imports = []
+
+    def new_import_database():
+        if imports:
+            imports.pop().close()
+        imports.append(empty_database(import_path))
+        return imports[-1]
+
+    results["import_csv"] = timed(lambda import_conn: import_csv(import_conn, csv_path, lambda *progress: None)[0],
+                                  BULK_REPEATS, new_import_database)
+    imports[0].close()
+
+    for name in os.listdir(workdir):
+        os.remove(os.path.join(workdir, name))
+    return results
+
+
+# ================= Baseline comparison =================
+def compare(results, baseline):
+    # Returns [(size, operation, baseline ms, current ms, ratio, regressed)]
+    rows = []
+    for size, operations in results.items():
+        for operation, entry in operations.items():
+            before = baseline.get(size, {}).get(operation)
+            if before is None:
+                continue
+            ratio = entry["median_ms"] / before["median_ms"] if before["median_ms"] else 1.0
+            regressed = (ratio > 1 + REGRESSION_THRESHOLD
+                         and entry["median_ms"] - before["median_ms"] > REGRESSION_MIN_MS
+                         and min(entry["runs"], before.get("runs", 1)) > 1)
+            rows.append((size, operation, before["median_ms"], entry["median_ms"], ratio, regressed))
+    return rows
+
+
+def print_report(results, comparison):
+    compared = {(size, operation): row for size, operation, *row in comparison}
+    for size, operations in results.items():
+        print(f"\n{size} tasks", file=sys.stderr)
+        for operation, entry in operations.items():
+            line = f"  {operation:<34} {entry['median_ms']:>11.3f} ms"
+            if (size, operation) in compared:
+                before, _, ratio, regressed = compared[size, operation]
+                line += f"  baseline {before:>11.3f} ms  x{ratio:.2f}"
+                if regressed:
+                    line += "  REGRESSION"
+            print(line, file=sys.stderr)
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Benchmark the To-Do task store on synthetic data")
+    parser.add_argument("--sizes", default=",".join(SIZES), help=f"comma-separated, from {', '.join(SIZES)}")
+    parser.add_argument("--seed", type=int, default=SEED)
+    parser.add_argument("--output", help="write the results as JSON to this file instead of stdout")
+    parser.add_argument("--baseline", default=BASELINE, help="results to compare against")
+    parser.add_argument("--save-baseline", action="store_true", help="store these results as the baseline")
+    args = parser.parse_args()
+
+    sizes = [size.strip() for size in args.sizes.split(",") if size.strip()]
+    unknown = [size for size in sizes if size not in SIZES]
+    if unknown:
+        parser.error(f"unknown sizes: {', '.join(unknown)}")
+
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="todo-bench-") as workdir:
+        for size in sizes:
+            print(f"Benchmarking {size} tasks...", file=sys.stderr)
+            results[size] = run_size(size, SIZES[size], workdir, args.seed)
+
+    report = {
+        "meta": {
+            "python": platform.python_version(),
+            "sqlite": sqlite3.sqlite_version,
+            "platform": platform.platform(),
+            "seed": args.seed,
+            "recorded": time.strftime("%Y-%m-%dT%H:%M:%S")
+        },
+        "results": results
+    }
+    comparison = []
+    if not args.save_baseline and os.path.exists(args.baseline):
+        with open(args.baseline, encoding="utf-8") as file:
+            comparison = compare(results, json.load(file)["results"])
+        report["comparison"] = [
+            {"size": size, "operation": operation, "baseline_ms": before, "median_ms": after,
+             "ratio": round(ratio, 3), "regression": regressed}
+            for size, operation, before, after, ratio, regressed in comparison]
+    print_report(results, comparison)
+
+    output = json.dumps(report, indent=2)
+    if args.save_baseline:
+        with open(args.baseline, mode="w", encoding="utf-8") as file:
+            file.write(output + "\n")
+        print(f"\nSaved baseline to {args.baseline}", file=sys.stderr)
+    elif args.output:
+        with open(args.output, mode="w", encoding="utf-8") as file:
+            file.write(output + "\n")
+    else:
+        print(output)
+
+    regressions = [row for row in comparison if row[5]]
+    if regressions:
+        print(f"\n{len(regressions)} regression(s) over {REGRESSION_THRESHOLD:.0%}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,54 @@
+import tkinter as tk
+from tkinter import ttk
+from datetime import date, datetime
+
+# tkcalendar (and the babel locale data it pulls in) is slow to import and its
+# DateEntry slow to build, so a DatePicker starts out as a plain read-only
+# entry and only builds the calendar when the user opens it: a click on the
+# entry, or Down/space while it has focus.
+
+
+class DatePicker(tk.Frame):
+    def __init__(self, parent, **options):
+        super().__init__(parent, bg=parent.cget("bg"))
+        self.options = options  # passed on to DateEntry
+        self.calendar = None
+        self.entry = ttk.Entry(self, font=options.get("font"), width=11)
+        self.entry.insert(0, date.today().isoformat())
+        self.entry.config(state="readonly", cursor="hand2")
+        self.entry.pack()
+        for sequence in ("<Button-1>", "<Down>", "<space>"):
+            self.entry.bind(sequence, self.open_calendar)
+
+    def open_calendar(self, event=None):
+        self.load_calendar()
+        self.calendar.focus_set()
+        # Drop down once the DateEntry has been laid out where the entry was
+        self.after_idle(self.calendar.drop_down)
+        return "break"
+
+    def load_calendar(self):
+        if self.calendar is not None:
+            return
+        from tkcalendar import DateEntry
+        value = self.get_date()
+        self.calendar = DateEntry(self, date_pattern="yyyy-mm-dd", **self.options)
+        self.calendar.set_date(value)
+        self.entry.destroy()
+        self.calendar.pack()
+
+    def get_date(self):
+        if self.calendar is not None:
+            return self.calendar.get_date()
+        return date.fromisoformat(self.entry.get())
+
+    def set_date(self, value):
+        if isinstance(value, datetime):
+            value = value.date()
+        if self.calendar is not None:
+            self.calendar.set_date(value)
+            return
+        self.entry.config(state="normal")
+        self.entry.delete(0, tk.END)
+        self.entry.insert(0, value.isoformat())
+        self.entry.config(state="readonly")
@@ -0,0 +1,154 @@
+import queue
+import threading
+import time
+from concurrent.futures import Future
+from task_repository import DATABASE, DURABILITY, connect
+
+# How often the Tk main loop checks for finished database jobs
+POLL_INTERVAL_MS = 20
+
+# Write-behind: pending writes are committed once the worker has been idle
+# this long, and never later than FLUSH_INTERVAL after the first one
+IDLE_FLUSH_INTERVAL = 0.1
+FLUSH_INTERVAL = 1.0
+
+
+# Common jobs for DatabaseWorker.submit()
+def fetch_all(conn, query, params=()):
+    return conn.execute(query, params).fetchall()
+
+
+def fetch_one(conn, query, params=()):
+    return conn.execute(query, params).fetchone()
+
+
+# Runs database jobs on a background thread that owns its own connection.
+# Jobs are called as func(conn, *args); submit() returns a Future, and the
+# callback/errback given to submit() run on the Tk main loop. errback
+# defaults to the one given here; without any, the error is re-raised in Tk.
+# A read_only worker cannot change the database. With durability
+# "write-behind" a job's writes are reported done before they are committed;
+# they are committed in groups when the worker goes idle, after
+# FLUSH_INTERVAL, or when close() is called.
+class DatabaseWorker:
+    def __init__(self, root, database=DATABASE, errback=None, read_only=False, durability=DURABILITY):
+        self.root = root
+        self.database = database
+        self.errback = errback
+        self.read_only = read_only
+        self.durability = durability
+        self.flush_deadline = None
+        self.conn = None
+        self.connect_error = None
+        self.requests = queue.Queue()
+        self.results = queue.Queue()
+        self.calls = queue.Queue()
+        self.ready = threading.Event()
+        self.thread = threading.Thread(target=self.run, daemon=True)
+        self.thread.start()
+        self.ready.wait()
+        if self.connect_error is not None:
+            # e.g. a read-only worker on a missing file, or "database is locked"
+            self.thread.join()
+            raise self.connect_error
+        self.poll_id = self.root.after(POLL_INTERVAL_MS, self.poll)
+
+    def run(self):
+        try:
+            self.conn = connect(self.database, self.read_only, self.durability)
+            self.conn.write_behind = self.durability == "write-behind" and not self.read_only
+        except BaseException as exc:
+            self.connect_error = exc
+            return
+        finally:
+            self.ready.set()
+        while True:
+            try:
+                job = self.requests.get(timeout=self.flush_timeout())
+            except queue.Empty:
+                self.flush()
+                continue
+            if job is None:
+                break
+            future, func, args = job
+            if not future.set_running_or_notify_cancel():
+                continue
+            try:
+                result = func(self.conn, *args)
+            except BaseException as exc:
+                future.set_exception(exc)
+            else:
+                future.set_result(result)
+            if self.conn.in_transaction and self.flush_deadline is None:
+                self.flush_deadline = time.monotonic() + FLUSH_INTERVAL
+        self.flush()
+        self.conn.close()
+
+    def flush_timeout(self):
+        # How long to wait for the next job before committing pending writes
+        if self.flush_deadline is None:
+            return None
+        return max(0, min(IDLE_FLUSH_INTERVAL, self.flush_deadline - time.monotonic()))
+
+    def flush(self):
+        # Runs on the worker thread: commit the group of pending writes
+        self.flush_deadline = None
+        if not self.conn.in_transaction:
+            return
+        try:
+            self.conn.commit()
+        except Exception as exc:
+            self.conn.rollback()
+            if self.errback is not None:
+                self.post(self.errback, exc)
+
+    def submit(self, func, *args, callback=None, errback=None):
+        future = Future()
+        errback = errback or self.errback
+        if callback is not None or errback is not None:
+            future.add_done_callback(lambda f: self.results.put((f, callback, errback)))
+        self.requests.put((future, func, args))
+        return future
+
+    def post(self, func, *args):
+        # Called from a running job to have func(*args) run on the Tk main loop
+        self.calls.put((func, args))
+
+    def interrupt(self):
+        # Abort whatever statement the worker is running right now
+        if self.conn is not None:
+            self.conn.interrupt()
+
+    def poll(self):
+        self.poll_id = self.root.after(POLL_INTERVAL_MS, self.poll)
+        while True:
+            try:
+                func, args = self.calls.get_nowait()
+            except queue.Empty:
+                break
+            func(*args)
+        while True:
+            try:
+                future, callback, errback = self.results.get_nowait()
+            except queue.Empty:
+                break
+            if future.cancelled():
+                continue
+            exc = future.exception()
+            if exc is not None:
+                if errback is None:
+                    raise exc
+                errback(exc)
+            elif callback is not None:
+                callback(future.result())
+
+    def close(self):
+        if self.poll_id is not None:
+            self.root.after_cancel(self.poll_id)
+            self.poll_id = None
+        self.requests.put(None)
+        self.thread.join()
+        # Report anything the final flush ran into
+        while not self.calls.empty():
+            func, args = self.calls.get_nowait()
+            func(*args)
@@ -0,0 +1,128 @@
+import time
+import tkinter as tk
+from tkinter import ttk
+import instrumentation
+from instrumentation import BUCKETS_MS
+
+# How often the open panel re-reads the histograms
+PANEL_REFRESH_MS = 1000
+
+COLUMNS = ("Kind", "Name", "Count", "Total ms", "p50 ms", "p90 ms", "p99 ms", "Max ms", "Avg rows")
+BUCKET_LABELS = [f"<= {bound:g} ms" for bound in BUCKETS_MS] + [f"> {BUCKETS_MS[-1]:g} ms"]
+
+
+# Window showing what instrumentation has recorded: one row per SQL statement
+# or UI operation, the histogram of the selected one, and the slow query log
+# with query plans. Recording can be switched on and off here.
+class DebugPanel:
+    def __init__(self, root, on_close=None):
+        self.on_close = on_close
+        self.window = tk.Toplevel(root)
+        self.window.title("Debug: Timings")
+        self.window.geometry("1000x650")
+        self.window.protocol("WM_DELETE_WINDOW", self.close)
+        self.summaries = {}
+        self.selected_key = None  # (kind, name) of the operation shown in the histogram
+        self.slow_queries = []
+        self.refresh_id = None
+
+        toolbar = tk.Frame(self.window)
+        toolbar.pack(fill=tk.X, padx=5, pady=5)
+        self.enabled_var = tk.BooleanVar(value=instrumentation.enabled)
+        tk.Checkbutton(toolbar, text="Record timings", variable=self.enabled_var,
+                       command=lambda: instrumentation.set_enabled(self.enabled_var.get())).pack(side=tk.LEFT)
+        tk.Label(toolbar, text=f"Slow query threshold: {instrumentation.SLOW_QUERY_MS:g} ms").pack(side=tk.LEFT,
+                                                                                                  padx=10)
+        tk.Button(toolbar, text="Reset", command=self.reset).pack(side=tk.RIGHT)
+
+        panes = ttk.PanedWindow(self.window, orient=tk.VERTICAL)
+        panes.pack(fill=tk.BOTH, expand=True, padx=5, pady=5)
+
+        # Timings per operation, most total time first
+        self.tree = ttk.Treeview(panes, columns=COLUMNS, show="headings", selectmode="browse", height=12)
+        for col in COLUMNS:
+            self.tree.heading(col, text=col, anchor="w")
+            self.tree.column(col, width=80, anchor="e")
+        self.tree.column("Kind", width=50, anchor="w")
+        self.tree.column("Name", width=400, anchor="w")
+        self.tree.bind("<<TreeviewSelect>>", lambda event: self.show_histogram())
+        panes.add(self.tree, weight=3)
+
+        details = tk.Frame(panes)
+        self.histogram_text = tk.Text(details, width=45, height=12, font=("Courier", 10))
+        self.histogram_text.pack(side=tk.LEFT, fill=tk.Y)
+        slow_frame = tk.Frame(details)
+        slow_frame.pack(side=tk.LEFT, fill=tk.BOTH, expand=True, padx=(5, 0))
+        tk.Label(slow_frame, text="Slow queries", anchor="w").pack(fill=tk.X)
+        self.slow_list = tk.Listbox(slow_frame, height=5)
+        self.slow_list.pack(fill=tk.X)
+        self.slow_list.bind("<<ListboxSelect>>", lambda event: self.show_slow_query())
+        self.plan_text = tk.Text(slow_frame, height=8, font=("Courier", 10))
+        self.plan_text.pack(fill=tk.BOTH, expand=True)
+        panes.add(details, weight=2)
+
+        self.refresh()
+
+    def refresh(self):
+        self.refresh_id = self.window.after(PANEL_REFRESH_MS, self.refresh)
+        self.enabled_var.set(instrumentation.enabled)
+        self.summaries = {}
+        self.tree.delete(*self.tree.get_children())
+        for index, summary in enumerate(instrumentation.summaries()):
+            iid = str(index)
+            self.summaries[iid] = summary
+            mean_rows = "" if summary.mean_rows is None else f"{summary.mean_rows:,.1f}"
+            self.tree.insert("", "end", iid=iid, values=(
+                summary.kind, summary.name, f"{summary.count:,}", f"{summary.total_ms:,.1f}", f"{summary.p50:.2f}",
+                f"{summary.p90:.2f}", f"{summary.p99:.2f}", f"{summary.max:.2f}", mean_rows))
+        # Keep the selection on the same operation as rows move around
+        for iid, summary in self.summaries.items():
+            if (summary.kind, summary.name) == self.selected_key:
+                self.tree.selection_set(iid)
+                break
+
+        slow_queries = instrumentation.slow_query_log()
+        if slow_queries != self.slow_queries:
+            self.slow_queries = slow_queries
+            self.slow_list.delete(0, tk.END)
+            for entry in reversed(slow_queries):
+                stamp = time.strftime("%H:%M:%S", time.localtime(entry.recorded))
+                self.slow_list.insert(tk.END, f"{stamp}  {entry.elapsed_ms:8.1f} ms  {entry.sql[:120]}")
+
+    def show_histogram(self):
+        selected = self.tree.selection()
+        if not selected or selected[0] not in self.summaries:
+            return
+        summary = self.summaries[selected[0]]
+        self.selected_key = (summary.kind, summary.name)
+        peak = max(summary.buckets) or 1
+        lines = [f"Last {sum(summary.buckets):,} of {summary.count:,} runs", ""]
+        for label, count in zip(BUCKET_LABELS, summary.buckets):
+            lines.append(f"{label:>12} {'#' * round(20 * count / peak):<20} {count:,}")
+        self.histogram_text.delete("1.0", tk.END)
+        self.histogram_text.insert("1.0", "\n".join(lines))
+
+    def show_slow_query(self):
+        selected = self.slow_list.curselection()
+        if not selected:
+            return
+        entry = self.slow_queries[len(self.slow_queries) - 1 - selected[0]]
+        text = (f"{entry.elapsed_ms:.1f} ms, {entry.rows} rows\n\n{entry.sql}\n\nParameters: {entry.params}\n\n"
+                f"Query plan:\n{entry.plan or '(not available)'}")
+        self.plan_text.delete("1.0", tk.END)
+        self.plan_text.insert("1.0", text)
+
+    def reset(self):
+        instrumentation.reset()
+        self.window.after_cancel(self.refresh_id)
+        self.histogram_text.delete("1.0", tk.END)
+        self.plan_text.delete("1.0", tk.END)
+        self.refresh()
+
+    def close(self):
+        if self.refresh_id is not None:
+            self.window.after_cancel(self.refresh_id)
+            self.refresh_id = None
+        self.window.destroy()
+        if self.on_close is not None:
+            self.on_close()
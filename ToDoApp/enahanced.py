@@ -1,9 +1,19 @@
+import time
 import tkinter as tk
-from tkinter import ttk, messagebox, filedialog
-from tkcalendar import DateEntry
+from tkinter import ttk, messagebox, filedialog, simpledialog
 import sqlite3
-from datetime import datetime, timedelta
-import csv
+from datetime import date, datetime, timedelta
+from collections import namedtuple
+from date_picker import DatePicker
+from db_worker import DatabaseWorker, fetch_all
+from debug_panel import DebugPanel
+from instrumentation import Timer, timed
+from recurrence import PRESETS, parse_rule
+from reminders import ReminderScheduler, reminder_message
+from task_repository import (PRIORITIES, PRIORITY_RANK_SQL, TASK_COLUMNS, Task, Criterion, setup_database, get_task,
+                             list_categories, compile_filter, overdue_criteria, add_category, add_task, update_task,
+                             complete_tasks, delete_tasks, prioritize_tasks, recategorize_tasks, shift_due_dates,
+                             clear_tasks, export_tasks, import_csv, keyset_condition)
 
 # ================= Constants & Styles =================
 COLOR_SCHEME = {
@@ -34,37 +44,91 @@ PADDING = {
 
 TIME_OPTIONS = [f"{h:02d}:{m:02d}" for h in range(24) for m in (0, 15, 30, 45)]
 
-# ================= Database Setup =================
-conn = sqlite3.connect("todo.db")
-cursor = conn.cursor()
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS tasks (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    task TEXT NOT NULL,
-    due_date TEXT,
-    due_time TEXT,
-    priority TEXT,
-    category TEXT,
-    completed INTEGER DEFAULT 0,
-    recurrence TEXT,
-    notes TEXT
-)
-""")
-
-# Check for missing columns
-cursor.execute("PRAGMA table_info(tasks)")
-columns = [column[1] for column in cursor.fetchall()]
-if 'due_time' not in columns:
-    cursor.execute("ALTER TABLE tasks ADD COLUMN due_time TEXT")
-if 'category' not in columns:
-    cursor.execute("ALTER TABLE tasks ADD COLUMN category TEXT")
-if 'recurrence' not in columns:
-    cursor.execute("ALTER TABLE tasks ADD COLUMN recurrence TEXT")
-if 'notes' not in columns:
-    cursor.execute("ALTER TABLE tasks ADD COLUMN notes TEXT")
-
-conn.commit()
+# Virtual list: rows fetched per page and the most rows kept in the Treeview
+PAGE_SIZE = 100
+MAX_LOADED_ROWS = 300
+PAGE_TRIGGER = 0.1
+# Ids per query when re-reading edited rows; short batches are padded so the
+# statement text (and its cached plan) is always the same
+SYNC_BATCH_SIZE = 100
+
+# Pause after the last keystroke before the search runs
+SEARCH_DELAY_MS = 250
+
+# SQL sort expressions per sortable Treeview column; each is backed by an index
+# in task_repository, so paging a sorted view never sorts the whole table.
+# Notes is left out: an index over every note would cost more than it saves.
+# Category sorts by category id, the order of the Category filter list.
+SORT_EXPRESSIONS = {
+    "ID": ["id"],
+    "Task": ["task"],
+    "Due Date": ["IFNULL(due_at, 0)"],
+    "Time": ["IFNULL(due_time, '')"],
+    "Priority": [PRIORITY_RANK_SQL],
+    "Category": ["IFNULL(category_id, 0)"],
+    "Status": ["completed"],
+    "Recurrence": ["IFNULL(recurrence, '')"]
+}
+
+# Choices for the due date filter
+DUE_FILTERS = ["All", "Overdue", "Today", "This Week", "Next 7 Days"]
+
+# A snapshot of the filtered, sorted query behind the Treeview
+TaskView = namedtuple("TaskView", ["query", "conditions", "params", "order"])
+
+
+def due_filter_range(due_filter):
+    # [start, end) in epoch seconds for a DUE_FILTERS choice other than Overdue
+    today = datetime.combine(date.today(), datetime.min.time())
+    if due_filter == "Today":
+        start, end = today, today + timedelta(days=1)
+    elif due_filter == "This Week":
+        start = today - timedelta(days=today.weekday())
+        end = start + timedelta(days=7)
+    else:
+        start, end = today, today + timedelta(days=7)
+    return int(start.timestamp()), int(end.timestamp())
+
+
+def page_sql(view, after=None, before=None, limit=True):
+    # Keyset pagination on the sort key: one extra row tells us whether more exist.
+    # limit=False gives the whole view in order (used by export).
+    params = list(view.params)
+    backwards = before is not None
+    conditions = list(view.conditions)
+    if after is not None or before is not None:
+        condition, key_params = keyset_condition(view.order, after if after is not None else before, backwards)
+        conditions.append(condition)
+        params.extend(key_params)
+    query = view.query
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY " + ", ".join(
+        f"{expr} {'DESC' if reverse != backwards else 'ASC'}" for expr, reverse in view.order)
+    if limit:
+        query += " LIMIT ?"
+        params.append(PAGE_SIZE + 1)
+    return query, params
+
+
+def fetch_view_rows(conn, view, task_ids):
+    # The given tasks as the view shows them; rows it filters out are missing
+    conditions = view.conditions + [f"id IN ({', '.join('?' * SYNC_BATCH_SIZE)})"]
+    query = view.query + " WHERE " + " AND ".join(conditions)
+    rows = []
+    for start in range(0, len(task_ids), SYNC_BATCH_SIZE):
+        batch = task_ids[start:start + SYNC_BATCH_SIZE]
+        batch += batch[-1:] * (SYNC_BATCH_SIZE - len(batch))
+        rows.extend(conn.execute(query, (*view.params, *batch)).fetchall())
+    return rows
+
+
+def tasks_message(count, action):
+    # "Task deleted successfully!" or "3 tasks deleted successfully!"
+    if count == 1:
+        return f"Task {action} successfully!"
+    return f"{count:,} tasks {action} successfully!"
+
 
 # ================= Main Application =================
 class TodoApp:
@@ -72,17 +136,109 @@ class TodoApp:
         self.root = root
         self.root.title("Advanced To-Do App")
         self.root.geometry("1200x800")
-        self.sort_column = None
-        self.sort_reverse = False
+        self.sort_keys = []  # [(column, reverse), ...], primary key first
+
+        # Virtual list state: the loaded window spans first_key..last_key
+        self.view = TaskView("", [], (), [("id", False)])
+        self.first_key = None
+        self.last_key = None
+        self.more_before = False
+        self.more_after = False
+        self.paging = False
+        self.row_cache = {}
+
+        # All database work runs on worker threads; search-as-you-type has its
+        # own read-only worker so it can be interrupted without touching
+        # pending writes. It is started once setup has created the database.
+        self.db = DatabaseWorker(root, errback=self.show_database_error)
+        self.search_db = None
+        self.reminders = ReminderScheduler(root, self.db, self.show_reminders)
+        self.categories = []  # cached from the categories table
+        self.category_ids = {}
+        self.fts_enabled = False
+        self.search_after_id = None
+        self.view_generation = 0
+        self.debug_panel = None
+        self.edit_window = None  # built on first edit, then reused
+        self.edit_task_id = None
         
         # Create main frames
         self.input_frame = tk.Frame(root, bg=COLOR_SCHEME["primary"])
         self.view_frame = tk.Frame(root, bg=COLOR_SCHEME["primary"])
         
+        # The full view is built the first time it is shown
+        self.full_view_built = False
         self.setup_input_view()
-        self.setup_full_view()
         self.show_input_view()
-        self.refresh_tasks()
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.root.bind("<F12>", lambda event: self.toggle_debug_panel())
+        self.db.submit(setup_database, callback=self.database_ready)
+
+    def database_ready(self, fts_enabled):
+        self.fts_enabled = fts_enabled
+        try:
+            self.search_db = DatabaseWorker(self.root, errback=self.show_database_error, read_only=True)
+        except sqlite3.Error as exc:
+            self.show_database_error(exc)
+            return
+        self.load_categories()
+        if self.full_view_built:
+            self.refresh_tasks()
+        self.reminders.start()
+
+    def window_shown(self, started):
+        # Called once the main loop first goes idle, i.e. the window is up.
+        # started is taken before Tk starts, so module imports aren't counted
+        # (python -X importtime shows those).
+        Timer("ui", "time_to_first_window", started=started).stop()
+
+    def load_categories(self):
+        # Refill the category combos; the filter only offers categories in use
+        self.db.submit(list_categories, callback=self.categories_loaded)
+        if self.full_view_built:
+            self.db.submit(list_categories, True, callback=self.filter_categories_loaded)
+
+    def categories_loaded(self, categories):
+        self.categories = categories
+        self.category_ids = {category.name: category.id for category in categories}
+        self.category_combo["values"] = [category.name for category in categories]
+
+    def filter_categories_loaded(self, categories):
+        self.filter_category_combo["values"] = ["All"] + [category.name for category in categories]
+
+    def new_category(self):
+        name = simpledialog.askstring("New Category", "Category name:", parent=self.root)
+        if name and name.strip():
+            self.db.submit(add_category, name, callback=lambda _: self.category_added(name.strip()))
+
+    def category_added(self, name):
+        self.load_categories()
+        self.category_combo.set(name)
+
+    def show_database_error(self, exc):
+        messagebox.showerror("Database Error", str(exc))
+
+    def show_reminders(self, tasks):
+        self.root.bell()
+        messagebox.showinfo("Reminder", reminder_message(tasks))
+
+    def toggle_debug_panel(self):
+        # Timings recorded by instrumentation; F12 or the Debug button
+        if self.debug_panel is not None:
+            self.debug_panel.close()
+        else:
+            self.debug_panel = DebugPanel(self.root, on_close=self.debug_panel_closed)
+
+    def debug_panel_closed(self):
+        self.debug_panel = None
+
+    def close(self):
+        # Let queued writes finish before the window goes away
+        self.reminders.stop()
+        if self.search_db is not None:
+            self.search_db.close()
+        self.db.close()
+        self.root.destroy()
 
     def setup_input_view(self):
         input_container = tk.Frame(self.input_frame, bg=COLOR_SCHEME["primary"])
@@ -110,9 +266,8 @@ class TodoApp:
         # Date Picker
         tk.Label(datetime_frame, text="Due Date:", bg=COLOR_SCHEME["primary"], 
                 fg=COLOR_SCHEME["text"], font=FONT_SCHEME["body"]).pack(side=tk.LEFT)
-        self.due_date_cal = DateEntry(
+        self.due_date_cal = DatePicker(
             datetime_frame,
-            date_pattern="yyyy-mm-dd",
             font=FONT_SCHEME["body"],
             background=COLOR_SCHEME["dark"],
             foreground=COLOR_SCHEME["text"],
@@ -143,7 +298,7 @@ class TodoApp:
                 fg=COLOR_SCHEME["text"], font=FONT_SCHEME["body"]).pack(side=tk.LEFT)
         self.priority_combo = ttk.Combobox(
             dropdown_frame,
-            values=["Low", "Medium", "High"],
+            values=PRIORITIES,
             font=FONT_SCHEME["body"],
             state="readonly",
             width=10
@@ -156,23 +311,26 @@ class TodoApp:
                 fg=COLOR_SCHEME["text"], font=FONT_SCHEME["body"]).pack(side=tk.LEFT)
         self.category_combo = ttk.Combobox(
             dropdown_frame,
-            values=["Work", "Personal", "Shopping", "Other"],
             font=FONT_SCHEME["body"],
             state="readonly",
             width=10
         )
         self.category_combo.set("Work")
-        self.category_combo.pack(side=tk.LEFT, padx=PADDING["medium"])
+        self.category_combo.pack(side=tk.LEFT)
+        new_category_btn = tk.Button(dropdown_frame, text="➕", command=self.new_category,
+                                     bg=COLOR_SCHEME["accent"], fg=COLOR_SCHEME["text"],
+                                     font=FONT_SCHEME["small"], relief=tk.FLAT)
+        new_category_btn.pack(side=tk.LEFT, padx=PADDING["medium"])
 
         # Recurrence
         tk.Label(dropdown_frame, text="Recurrence:", bg=COLOR_SCHEME["primary"], 
                 fg=COLOR_SCHEME["text"], font=FONT_SCHEME["body"]).pack(side=tk.LEFT)
+        # Editable so RRULE-style rules can be typed, e.g. FREQ=WEEKLY;BYDAY=MO,TH
         self.recurrence_combo = ttk.Combobox(
             dropdown_frame,
-            values=["None", "Daily", "Weekly", "Monthly"],
+            values=list(PRESETS),
             font=FONT_SCHEME["body"],
-            state="readonly",
-            width=10
+            width=14
         )
         self.recurrence_combo.set("None")
         self.recurrence_combo.pack(side=tk.LEFT, padx=PADDING["medium"])
@@ -218,7 +376,7 @@ class TodoApp:
 
         self.filter_priority_combo = ttk.Combobox(
             filter_frame,
-            values=["All", "Low", "Medium", "High"],
+            values=["All"] + PRIORITIES,
             font=FONT_SCHEME["body"],
             state="readonly",
             width=10
@@ -228,7 +386,7 @@ class TodoApp:
 
         self.filter_category_combo = ttk.Combobox(
             filter_frame,
-            values=["All", "Work", "Personal", "Shopping", "Other"],
+            values=["All"],
             font=FONT_SCHEME["body"],
             state="readonly",
             width=10
@@ -246,6 +404,16 @@ class TodoApp:
         self.filter_status_combo.set("All")
         self.filter_status_combo.pack(side=tk.LEFT, padx=PADDING["medium"])
 
+        self.filter_due_combo = ttk.Combobox(
+            filter_frame,
+            values=DUE_FILTERS,
+            font=FONT_SCHEME["body"],
+            state="readonly",
+            width=12
+        )
+        self.filter_due_combo.set("All")
+        self.filter_due_combo.pack(side=tk.LEFT, padx=PADDING["medium"])
+
         filter_btn = tk.Button(filter_frame, text="Apply Filters", 
                               command=self.refresh_tasks,
                               bg=COLOR_SCHEME["accent"], fg=COLOR_SCHEME["text"],
@@ -261,6 +429,7 @@ class TodoApp:
         self.search_entry = tk.Entry(search_frame, font=FONT_SCHEME["body"], 
                                    bg=COLOR_SCHEME["light"], width=40)
         self.search_entry.pack(side=tk.LEFT, padx=PADDING["medium"])
+        self.search_entry.bind("<KeyRelease>", self.schedule_search)
 
         search_btn = tk.Button(search_frame, text="🔍 Search", 
                               command=self.refresh_tasks,
@@ -289,14 +458,19 @@ class TodoApp:
         # Task Tree
         self.task_tree = ttk.Treeview(tree_container, 
                                     columns=("ID", "Task", "Due Date", "Time", "Priority", "Category", "Status", "Recurrence", "Notes"), 
-                                    show="headings", selectmode="browse")
+                                    show="headings", selectmode="extended")
         
         # Configure columns
         columns = ("ID", "Task", "Due Date", "Time", "Priority", "Category", "Status", "Recurrence", "Notes")
         for col in columns:
-            self.task_tree.heading(col, text=col, anchor="w", 
-                                  command=lambda c=col: self.treeview_sort_column(c))
+            if col in SORT_EXPRESSIONS:
+                self.task_tree.heading(col, text=col, anchor="w",
+                                      command=lambda c=col: self.treeview_sort_column(c))
+            else:
+                self.task_tree.heading(col, text=col, anchor="w")
             self.task_tree.column(col, anchor="w")
+        # Shift-click a heading to add it as a secondary sort column
+        self.task_tree.bind("<Shift-Button-1>", self.on_heading_shift_click)
 
         self.task_tree.column("ID", width=80)
         self.task_tree.column("Task", width=400)
@@ -311,7 +485,8 @@ class TodoApp:
         # Scrollbars
         vsb = ttk.Scrollbar(tree_container, orient="vertical", command=self.task_tree.yview)
         hsb = ttk.Scrollbar(tree_container, orient="horizontal", command=self.task_tree.xview)
-        self.task_tree.configure(yscrollcommand=vsb.set, xscrollcommand=hsb.set)
+        self.tree_vsb = vsb
+        self.task_tree.configure(yscrollcommand=self.on_tree_scroll, xscrollcommand=hsb.set)
         
         # Layout using grid
         self.task_tree.grid(row=0, column=0, sticky="nsew")
@@ -343,6 +518,22 @@ class TodoApp:
                               font=FONT_SCHEME["button"], relief=tk.FLAT)
         delete_btn.pack(side=tk.LEFT, padx=5)
 
+        # Changes applied to every selected task at once
+        bulk_btn = tk.Menubutton(action_frame, text="🗂️ Bulk Edit ▾",
+                                 bg=COLOR_SCHEME["secondary"], fg=COLOR_SCHEME["text"],
+                                 font=FONT_SCHEME["button"], relief=tk.FLAT)
+        bulk_menu = tk.Menu(bulk_btn, tearoff=False, postcommand=self.update_bulk_menu)
+        priority_menu = tk.Menu(bulk_menu, tearoff=False)
+        for priority in PRIORITIES + [""]:
+            priority_menu.add_command(label=priority or "(None)",
+                                      command=lambda priority=priority: self.prioritize_selected(priority))
+        self.category_menu = tk.Menu(bulk_menu, tearoff=False)
+        bulk_menu.add_cascade(label="Set Priority", menu=priority_menu)
+        bulk_menu.add_cascade(label="Set Category", menu=self.category_menu)
+        bulk_menu.add_command(label="Shift Due Date...", command=self.shift_selected)
+        bulk_btn.config(menu=bulk_menu)
+        bulk_btn.pack(side=tk.LEFT, padx=5)
+
         clear_btn = tk.Button(action_frame, text="🧹 Clear All Tasks", 
                               command=self.clear_all_tasks,
                               bg=COLOR_SCHEME["warning"], fg=COLOR_SCHEME["text"],
@@ -360,6 +551,19 @@ class TodoApp:
                               bg=COLOR_SCHEME["accent"], fg=COLOR_SCHEME["text"],
                               font=FONT_SCHEME["button"], relief=tk.FLAT)
         import_btn.pack(side=tk.LEFT, padx=5)
+        self.import_btn = import_btn
+
+        debug_btn = tk.Button(action_frame, text="🐞 Debug",
+                              command=self.toggle_debug_panel,
+                              bg=COLOR_SCHEME["secondary"], fg=COLOR_SCHEME["text"],
+                              font=FONT_SCHEME["button"], relief=tk.FLAT)
+        debug_btn.pack(side=tk.RIGHT, padx=5)
+
+        # Status line for long-running operations
+        self.status_label = tk.Label(view_container, text="", anchor="w",
+                                     bg=COLOR_SCHEME["primary"], fg=COLOR_SCHEME["text"],
+                                     font=FONT_SCHEME["small"])
+        self.status_label.pack(fill=tk.X)
 
     def show_input_view(self):
         self.view_frame.pack_forget()
@@ -367,10 +571,15 @@ class TodoApp:
         self.root.geometry("800x600")
 
     def show_full_view(self):
+        if not self.full_view_built:
+            self.setup_full_view()
+            self.full_view_built = True
+            self.load_categories()
         self.input_frame.pack_forget()
         self.view_frame.pack(fill=tk.BOTH, expand=True)
         self.root.geometry("1200x800")
-        self.refresh_tasks()
+        if self.search_db is not None:
+            self.refresh_tasks()  # otherwise database_ready will
 
     def add_task(self):
         task = self.task_entry.get()
@@ -382,267 +591,630 @@ class TodoApp:
         notes = self.notes_entry.get("1.0", tk.END).strip()
 
         if task:
-            cursor.execute("""
-                INSERT INTO tasks (task, due_date, due_time, priority, category, recurrence, notes)
-                VALUES (?, ?, ?, ?, ?, ?, ?)
-            """, (task, due_date, due_time, priority, category, recurrence, notes))
-            conn.commit()
+            if not self.check_recurrence(recurrence):
+                return
+            self.db.submit(add_task, task, due_date, due_time, priority, category, recurrence, notes,
+                           callback=lambda task_id: self.task_changed(task_id, "Task added successfully!"))
+            self.category_used(category)
             self.task_entry.delete(0, tk.END)
             self.notes_entry.delete("1.0", tk.END)
-            messagebox.showinfo("Success", "Task added successfully!")
-            self.refresh_tasks()
         else:
             messagebox.showwarning("Input Error", "Task description cannot be empty")
 
-    def refresh_tasks(self):
-        for item in self.task_tree.get_children():
-            self.task_tree.delete(item)
-            
+    def category_used(self, category):
+        # A category's first task puts it into the filter combo
+        if self.full_view_built and category and category not in self.filter_category_combo["values"]:
+            self.load_categories()
+
+    def check_recurrence(self, recurrence):
+        try:
+            parse_rule(recurrence)
+        except ValueError as exc:
+            messagebox.showwarning("Input Error", f"Invalid recurrence: {exc}")
+            return False
+        return True
+
+    def task_changed(self, task_id, message):
+        self.sync_task_row(task_id)
+        self.reminders.refresh(task_id)
+        messagebox.showinfo("Success", message)
+
+    def tasks_changed(self, task_ids, message):
+        # One view query for all the rows, and one reload of the reminders
+        self.sync_task_rows(task_ids)
+        self.reminders.start()
+        messagebox.showinfo("Success", message)
+
+    def refresh_tasks(self, operation="refresh_tasks"):
+        # operation names the timing recorded for this reload
+        timer = Timer("ui", operation)
+        self.view_generation += 1  # results of in-flight view queries are now stale
+        generation = self.view_generation
+        view = self.build_view()
+        query, params = page_sql(view)
+        self.db.submit(fetch_all, query, params,
+                       callback=lambda tasks: self.finish_view_load(generation, view, tasks, timer))
+
+    def build_view(self):
         priority_filter = self.filter_priority_combo.get()
         category_filter = self.filter_category_combo.get()
         status_filter = self.filter_status_combo.get()
+        due_filter = self.filter_due_combo.get()
         search_query = self.search_entry.get()
 
-        query = "SELECT id, task, due_date, due_time, priority, category, completed, recurrence, notes FROM tasks"
-        conditions = []
+        criteria = []
         if priority_filter != "All":
-            conditions.append(f"priority = '{priority_filter}'")
+            criteria.append(Criterion("priority", "=", priority_filter))
         if category_filter != "All":
-            conditions.append(f"category = '{category_filter}'")
+            criteria.append(Criterion("category_id", "=", self.category_ids.get(category_filter, 0)))
         if status_filter != "All":
-            conditions.append(f"completed = {1 if status_filter == 'Complete' else 0}")
-        if search_query:
-            conditions.append(f"task LIKE '%{search_query}%'")
-
-        if conditions:
-            query += " WHERE " + " AND ".join(conditions)
-
-        cursor.execute(query)
-        tasks = cursor.fetchall()
+            criteria.append(Criterion("completed", "=", status_filter == "Complete"))
+        if due_filter == "Overdue":
+            criteria.extend(overdue_criteria(datetime.now()))
+        elif due_filter != "All":
+            # Index range on due_at; tasks without a due date never match
+            criteria.append(Criterion("due_at", "range", due_filter_range(due_filter)))
+        criteria.append(Criterion("text", "match", search_query))
+        compiled = compile_filter(criteria, self.fts_enabled, ranked=True)
+
+        # Rows carry their sort key (ending with id) after the display columns.
+        # Without an explicit sort, search results come back best match first.
+        order = [(expr, reverse) for col, reverse in self.sort_keys
+                 for expr in SORT_EXPRESSIONS[col]]
+        if compiled.ranked and not order:
+            order.append(("match_rank", False))
+        order.append(("id", order[-1][1] if order else False))
+        query = f"SELECT {TASK_COLUMNS}, " + ", ".join(expr for expr, _ in order) + f" FROM {compiled.source}"
+        return TaskView(query, compiled.conditions, tuple(compiled.params), order)
+
+    def show_view(self, view, tasks):
+        # Only the first page is loaded; the rest is paged in while scrolling
+        timer = Timer("ui", "show_view")
+        for item in self.task_tree.get_children():
+            self.task_tree.delete(item)
+        self.row_cache.clear()
+
+        self.view = view
+        self.paging = False
+        self.first_key = None
+        self.last_key = None
+        self.more_before = False
+        self.more_after = len(tasks) > PAGE_SIZE
+        tasks = tasks[:PAGE_SIZE]
         for task in tasks:
-            status = "Complete" if task[6] else "Pending"
-            self.task_tree.insert("", "end", values=(
-                task[0], task[1], task[2], task[3], task[4], task[5], status, task[7], task[8]),
-                tags=("complete" if task[6] else "pending"))
+            self.insert_task_row(task)
+        if tasks:
+            self.first_key = self.row_key(tasks[0])
+            self.last_key = self.row_key(tasks[-1])
             
         self.task_tree.tag_configure("complete", background="#e8f5e9")
         self.task_tree.tag_configure("pending", background="#fffde7")
-
-    def treeview_sort_column(self, col):
-        data_type_converter = {
-            "ID": int,
-            "Due Date": lambda x: datetime.strptime(x, "%Y-%m-%d"),
-            "Time": lambda x: datetime.strptime(x, "%H:%M").time(),
-            "Priority": lambda x: {"Low": 1, "Medium": 2, "High": 3}[x],
-            "Status": lambda x: {"Complete": 1, "Pending": 2}[x],
-            "Task": str,
-            "Category": str,
-            "Recurrence": str,
-            "Notes": str
-        }
-
-        if self.sort_column == col:
-            self.sort_reverse = not self.sort_reverse
+        timer.stop(len(tasks))
+
+    def schedule_search(self, event=None):
+        # Each keystroke makes the running search stale and interrupts it
+        # straight away; the new one only starts once typing pauses
+        self.view_generation += 1
+        if self.search_db is not None:
+            self.search_db.interrupt()
+        if self.search_after_id is not None:
+            self.root.after_cancel(self.search_after_id)
+        self.search_after_id = self.root.after(SEARCH_DELAY_MS, self.start_search)
+
+    def start_search(self):
+        self.search_after_id = None
+        if self.search_db is None:
+            return  # the first load after setup picks up the search text
+        timer = Timer("ui", "search")
+        generation = self.view_generation
+        view = self.build_view()
+        query, params = page_sql(view)
+        self.search_db.submit(self.run_search, generation, query, params,
+                              callback=lambda tasks: self.finish_view_load(generation, view, tasks, timer),
+                              errback=lambda exc: self.search_failed(generation, exc))
+
+    def run_search(self, conn, generation, query, params):
+        # Runs on the search worker thread; stale searches are skipped or interrupted
+        for attempt in range(2):
+            if generation != self.view_generation:
+                return None
+            try:
+                return conn.execute(query, params).fetchall()
+            except sqlite3.OperationalError as exc:
+                # An interrupt aimed at the previous search can land on this one
+                if "interrupted" not in str(exc) or attempt:
+                    raise
+        return None
+
+    def finish_view_load(self, generation, view, tasks, timer=None):
+        # Only the most recently requested view reaches the Treeview
+        if generation == self.view_generation and tasks is not None:
+            self.show_view(view, tasks)
+            if timer is not None:
+                timer.stop(len(tasks))
+
+    def search_failed(self, generation, exc):
+        if generation == self.view_generation:
+            messagebox.showerror("Search Error", str(exc))
+
+    def key_precedes(self, a, b):
+        # True if sort key a comes before b in the current view order
+        for x, y, (_, reverse) in zip(a, b, self.view.order):
+            if x != y:
+                return x > y if reverse else x < y
+        return False
+
+    def row_key(self, task):
+        return tuple(task[9:])
+
+    def row_values(self, task):
+        status = "Complete" if task[6] else "Pending"
+        return (task[0], task[1], task[2], task[3], task[4], task[5], status, task[7], task[8])
+
+    def insert_task_row(self, task, index="end"):
+        self.task_tree.insert("", index, iid=str(task[0]), values=self.row_values(task),
+            tags=("complete" if task[6] else "pending"))
+        self.row_cache[task[0]] = task
+
+    def remove_task_row(self, task_id):
+        if self.task_tree.exists(str(task_id)):
+            self.task_tree.delete(str(task_id))
+        self.row_cache.pop(task_id, None)
+
+    def sync_task_row(self, task_id):
+        self.sync_task_rows([task_id])
+
+    def sync_task_rows(self, task_ids):
+        # Bring Treeview rows in line with the database after an edit
+        if not self.full_view_built:
+            return  # the whole view is loaded when first shown
+        task_ids = [int(task_id) for task_id in task_ids]
+        generation = self.view_generation
+        self.db.submit(fetch_view_rows, self.view, task_ids,
+                       callback=lambda rows: self.apply_task_rows(generation, task_ids, rows))
+
+    def apply_task_rows(self, generation, task_ids, rows):
+        found = {row[0]: row for row in rows}
+        for task_id in task_ids:
+            self.apply_task_row(generation, task_id, found.get(task_id))
+
+    def apply_task_row(self, generation, task_id, task):
+        if generation != self.view_generation:
+            return  # a reload queued after the edit will show it
+        cached = self.row_cache.get(task_id)
+        if task is None:
+            self.remove_task_row(task_id)
+            return
+        key = self.row_key(task)
+        if cached is not None and self.row_key(cached) == key:
+            self.task_tree.item(str(task_id), values=self.row_values(task),
+                                tags=("complete" if task[6] else "pending"))
+            self.row_cache[task_id] = task
+            return
+        self.remove_task_row(task_id)
+
+        # Rows outside the loaded window will be paged in when scrolled to
+        if self.more_before and self.key_precedes(key, self.first_key):
+            return
+        if self.more_after and self.key_precedes(self.last_key, key):
+            return
+        items = self.task_tree.get_children()
+        low, high = 0, len(items)
+        while low < high:
+            mid = (low + high) // 2
+            if self.key_precedes(self.row_key(self.row_cache[int(items[mid])]), key):
+                low = mid + 1
+            else:
+                high = mid
+        self.insert_task_row(task, index=low)
+        if self.first_key is None or self.key_precedes(key, self.first_key):
+            self.first_key = key
+        if self.last_key is None or self.key_precedes(self.last_key, key):
+            self.last_key = key
+
+    def on_tree_scroll(self, first, last):
+        self.tree_vsb.set(first, last)
+        if self.paging:
+            return
+        if float(last) >= 1 - PAGE_TRIGGER and self.more_after:
+            self.root.after_idle(self.load_next_page)
+        elif float(first) <= PAGE_TRIGGER and self.more_before:
+            self.root.after_idle(self.load_previous_page)
+
+    def load_next_page(self):
+        if self.paging or not self.more_after:
+            return
+        self.paging = True
+        generation = self.view_generation
+        query, params = page_sql(self.view, after=self.last_key)
+        self.db.submit(fetch_all, query, params,
+                       callback=lambda tasks: self.append_page(generation, tasks),
+                       errback=self.page_failed)
+
+    def append_page(self, generation, tasks):
+        self.paging = False
+        if generation != self.view_generation:
+            return
+        self.more_after = len(tasks) > PAGE_SIZE
+        tasks = tasks[:PAGE_SIZE]
+        for task in tasks:
+            self.insert_task_row(task)
+        if tasks:
+            self.last_key = self.row_key(tasks[-1])
+
+        # Drop rows scrolled far above the viewport to keep the window bounded
+        items = self.task_tree.get_children()
+        excess = len(items) - MAX_LOADED_ROWS
+        if excess > 0:
+            top = self.top_visible_index()
+            for item in items[:excess]:
+                self.remove_task_row(int(item))
+            self.first_key = self.row_key(self.row_cache[int(items[excess])])
+            self.more_before = True
+            self.scroll_to_index(top - excess)
+
+    def load_previous_page(self):
+        if self.paging or not self.more_before:
+            return
+        self.paging = True
+        generation = self.view_generation
+        query, params = page_sql(self.view, before=self.first_key)
+        self.db.submit(fetch_all, query, params,
+                       callback=lambda tasks: self.prepend_page(generation, tasks),
+                       errback=self.page_failed)
+
+    def page_failed(self, exc):
+        self.paging = False
+        self.show_database_error(exc)
+
+    def prepend_page(self, generation, tasks):
+        self.paging = False
+        if generation != self.view_generation:
+            return
+        self.more_before = len(tasks) > PAGE_SIZE
+        tasks = tasks[:PAGE_SIZE]
+        top = self.top_visible_index() + len(tasks)
+        for task in tasks:
+            self.insert_task_row(task, index=0)
+        if tasks:
+            self.first_key = self.row_key(tasks[-1])
+
+        # Drop rows scrolled far below the viewport
+        items = self.task_tree.get_children()
+        excess = len(items) - MAX_LOADED_ROWS
+        if excess > 0:
+            for item in items[-excess:]:
+                self.remove_task_row(int(item))
+            self.last_key = self.row_key(self.row_cache[int(items[-excess - 1])])
+            self.more_after = True
+        self.scroll_to_index(top)
+
+    def top_visible_index(self):
+        top_item = self.task_tree.identify_row(0)
+        return self.task_tree.index(top_item) if top_item else 0
+
+    def scroll_to_index(self, index):
+        items = self.task_tree.get_children()
+        if items:
+            self.task_tree.yview_moveto(max(index, 0) / len(items))
+
+    def treeview_sort_column(self, col, add=False):
+        # Sorting re-runs the filtered query with ORDER BY; shift-click adds a column
+        current = dict(self.sort_keys)
+        if add and col in current:
+            self.sort_keys = [(c, not r if c == col else r) for c, r in self.sort_keys]
+        elif add:
+            self.sort_keys.append((col, False))
+        elif [c for c, _ in self.sort_keys] == [col]:
+            self.sort_keys = [(col, not current[col])]
         else:
-            self.sort_column = col
-            self.sort_reverse = False
-
-        try:
-            converter = data_type_converter[col]
-        except KeyError:
-            converter = str
-
-        items = [(converter(self.task_tree.set(k, col)), k) 
-                for k in self.task_tree.get_children('')]
-
-        items.sort(reverse=self.sort_reverse)
+            self.sort_keys = [(col, False)]
 
-        for index, (val, k) in enumerate(items):
-            self.task_tree.move(k, '', index)
+        self.refresh_tasks("treeview_sort_column")
+        self.update_sort_arrow()
 
-        self.update_sort_arrow(col)
+    def on_heading_shift_click(self, event):
+        if self.task_tree.identify_region(event.x, event.y) != "heading":
+            return None
+        column_id = self.task_tree.identify_column(event.x)
+        col = self.task_tree["columns"][int(column_id.lstrip("#")) - 1]
+        if col in SORT_EXPRESSIONS:
+            self.treeview_sort_column(col, add=True)
+        return "break"
 
-    def update_sort_arrow(self, col):
+    def update_sort_arrow(self):
         for column in self.task_tree["columns"]:
             self.task_tree.heading(column, text=column)
-        arrow = " ↓" if self.sort_reverse else " ↑"
-        self.task_tree.heading(col, text=col + arrow)
+        for position, (col, reverse) in enumerate(self.sort_keys, 1):
+            arrow = " ↓" if reverse else " ↑"
+            if len(self.sort_keys) > 1:
+                arrow += str(position)
+            self.task_tree.heading(col, text=col + arrow)
+
+    def selected_task_ids(self):
+        # Treeview iids are the task ids
+        return [int(iid) for iid in self.task_tree.selection()]
 
     def complete_task(self):
-        selected = self.task_tree.selection()
-        if selected:
-            task_id = self.task_tree.item(selected[0], "values")[0]
-            cursor.execute("UPDATE tasks SET completed = 1 WHERE id = ?", (task_id,))
-            conn.commit()
-            self.refresh_tasks()
-            messagebox.showinfo("Success", "Task marked as complete!")
+        task_ids = self.selected_task_ids()
+        if task_ids:
+            # Repeating tasks come back as a new pending task for the next date
+            self.db.submit(complete_tasks, task_ids,
+                           callback=lambda next_ids: self.tasks_changed(
+                               task_ids + next_ids, tasks_message(len(task_ids), "marked as complete")))
+        else:
+            messagebox.showwarning("Selection Error", "Please select a task first")
+
+    def prioritize_selected(self, priority):
+        task_ids = self.selected_task_ids()
+        if task_ids:
+            self.db.submit(prioritize_tasks, task_ids, priority,
+                           callback=lambda _: self.tasks_changed(
+                               task_ids, tasks_message(len(task_ids), f"set to {priority or 'no'} priority")))
+        else:
+            messagebox.showwarning("Selection Error", "Please select a task first")
+
+    def recategorize_selected(self, category):
+        task_ids = self.selected_task_ids()
+        if task_ids:
+            self.db.submit(recategorize_tasks, task_ids, category,
+                           callback=lambda _: self.tasks_changed(
+                               task_ids, tasks_message(len(task_ids), f"moved to {category or 'no category'}")))
+            self.category_used(category)
         else:
             messagebox.showwarning("Selection Error", "Please select a task first")
 
+    def shift_selected(self):
+        task_ids = self.selected_task_ids()
+        if not task_ids:
+            messagebox.showwarning("Selection Error", "Please select a task first")
+            return
+        days = simpledialog.askinteger("Shift Due Date", "Days to move the due date by (negative moves it earlier):",
+                                       parent=self.root)
+        if days:
+            self.db.submit(shift_due_dates, task_ids, days,
+                           callback=lambda shifted: self.tasks_changed(
+                               task_ids, tasks_message(shifted, f"moved by {days:+d} days")))
+
+    def update_bulk_menu(self):
+        # Category choices are rebuilt each time the menu opens
+        self.category_menu.delete(0, tk.END)
+        for name in [""] + [category.name for category in self.categories]:
+            self.category_menu.add_command(label=name or "(None)",
+                                           command=lambda name=name: self.recategorize_selected(name))
+
     def edit_task(self):
         selected = self.task_tree.selection()
         if selected:
-            task_id = self.task_tree.item(selected[0], "values")[0]
-            cursor.execute("SELECT * FROM tasks WHERE id = ?", (task_id,))
-            task = cursor.fetchone()
-
-            edit_window = tk.Toplevel(self.root)
-            edit_window.title("Edit Task")
-            edit_window.geometry("600x400")
-
-            # Task Input
-            tk.Label(edit_window, text="Task:", font=FONT_SCHEME["body"]).pack(pady=PADDING["medium"])
-            task_entry = tk.Entry(edit_window, font=FONT_SCHEME["body"], width=40)
-            task_entry.insert(0, task[1])
-            task_entry.pack(pady=PADDING["medium"])
-
-            # Date and Time
-            datetime_frame = tk.Frame(edit_window)
-            datetime_frame.pack(pady=PADDING["medium"])
-
-            tk.Label(datetime_frame, text="Due Date:", font=FONT_SCHEME["body"]).pack(side=tk.LEFT)
-            due_date_cal = DateEntry(
-                datetime_frame,
-                date_pattern="yyyy-mm-dd",
-                font=FONT_SCHEME["body"],
-                background=COLOR_SCHEME["dark"],
-                foreground=COLOR_SCHEME["text"],
-                borderwidth=1,
-                relief=tk.FLAT
-            )
-            due_date_cal.set_date(datetime.strptime(task[2], "%Y-%m-%d"))
-            due_date_cal.pack(side=tk.LEFT, padx=PADDING["medium"])
-
-            tk.Label(datetime_frame, text="Time:", font=FONT_SCHEME["body"]).pack(side=tk.LEFT)
-            due_time_combo = ttk.Combobox(
-                datetime_frame,
-                values=TIME_OPTIONS,
-                font=FONT_SCHEME["body"],
-                state="readonly",
-                width=8
-            )
-            due_time_combo.set(task[3])
-            due_time_combo.pack(side=tk.LEFT, padx=PADDING["medium"])
-
-            # Priority & Category
-            dropdown_frame = tk.Frame(edit_window)
-            dropdown_frame.pack(pady=PADDING["medium"])
-
-            tk.Label(dropdown_frame, text="Priority:", font=FONT_SCHEME["body"]).pack(side=tk.LEFT)
-            priority_combo = ttk.Combobox(
-                dropdown_frame,
-                values=["Low", "Medium", "High"],
-                font=FONT_SCHEME["body"],
-                state="readonly",
-                width=10
-            )
-            priority_combo.set(task[4])
-            priority_combo.pack(side=tk.LEFT, padx=PADDING["medium"])
-
-            tk.Label(dropdown_frame, text="Category:", font=FONT_SCHEME["body"]).pack(side=tk.LEFT)
-            category_combo = ttk.Combobox(
-                dropdown_frame,
-                values=["Work", "Personal", "Shopping", "Other"],
-                font=FONT_SCHEME["body"],
-                state="readonly",
-                width=10
-            )
-            category_combo.set(task[5])
-            category_combo.pack(side=tk.LEFT, padx=PADDING["medium"])
-
-            # Recurrence
-            tk.Label(dropdown_frame, text="Recurrence:", font=FONT_SCHEME["body"]).pack(side=tk.LEFT)
-            recurrence_combo = ttk.Combobox(
-                dropdown_frame,
-                values=["None", "Daily", "Weekly", "Monthly"],
-                font=FONT_SCHEME["body"],
-                state="readonly",
-                width=10
-            )
-            recurrence_combo.set(task[7])
-            recurrence_combo.pack(side=tk.LEFT, padx=PADDING["medium"])
-
-            # Notes
-            tk.Label(edit_window, text="Notes:", font=FONT_SCHEME["body"]).pack(pady=PADDING["medium"])
-            notes_entry = tk.Text(edit_window, font=FONT_SCHEME["body"], width=40, height=4)
-            notes_entry.insert("1.0", task[8])
-            notes_entry.pack(pady=PADDING["medium"])
-
-            # Save Button
-            save_btn = tk.Button(edit_window, text="💾 Save Changes", 
-                                command=lambda: self.save_task_changes(
-                                    task_id, task_entry.get(), due_date_cal.get_date().strftime("%Y-%m-%d"),
-                                    due_time_combo.get(), priority_combo.get(), category_combo.get(),
-                                    recurrence_combo.get(), notes_entry.get("1.0", tk.END).strip(), edit_window
-                                ),
-                                bg=COLOR_SCHEME["success"], fg=COLOR_SCHEME["text"],
-                                font=FONT_SCHEME["button"], relief=tk.FLAT)
-            save_btn.pack(pady=PADDING["large"])
-
+            task_id = int(selected[0])
+            row = self.row_cache.get(task_id)
+            if row is not None:
+                # The Treeview row already holds every field the dialog shows
+                self.open_edit_window(task_id, Task._make(row[:len(Task._fields)]))
+            else:
+                self.db.submit(get_task, task_id,
+                               callback=lambda task: self.open_edit_window(task_id, task))
         else:
             messagebox.showwarning("Selection Error", "Please select a task to edit")
 
-    def save_task_changes(self, task_id, task, due_date, due_time, priority, category, recurrence, notes, window):
-        cursor.execute("""
-            UPDATE tasks 
-            SET task = ?, due_date = ?, due_time = ?, priority = ?, category = ?, recurrence = ?, notes = ?
-            WHERE id = ?
-        """, (task, due_date, due_time, priority, category, recurrence, notes, task_id))
-        conn.commit()
-        window.destroy()
-        self.refresh_tasks()
-        messagebox.showinfo("Success", "Task updated successfully!")
+    def setup_edit_window(self):
+        # Built on first use, then hidden and refilled for each edit
+        self.edit_window = tk.Toplevel(self.root)
+        self.edit_window.title("Edit Task")
+        self.edit_window.geometry("600x430")
+        self.edit_window.transient(self.root)
+        self.edit_window.protocol("WM_DELETE_WINDOW", self.close_edit_window)
+        self.edit_window.bind("<Escape>", lambda event: self.close_edit_window())
+
+        # Task Input
+        tk.Label(self.edit_window, text="Task:", font=FONT_SCHEME["body"]).pack(pady=PADDING["medium"])
+        self.edit_task_entry = tk.Entry(self.edit_window, font=FONT_SCHEME["body"], width=40)
+        self.edit_task_entry.pack(pady=PADDING["medium"])
+
+        # Date and Time
+        datetime_frame = tk.Frame(self.edit_window)
+        datetime_frame.pack(pady=PADDING["medium"])
+
+        tk.Label(datetime_frame, text="Due Date:", font=FONT_SCHEME["body"]).pack(side=tk.LEFT)
+        self.edit_due_date_cal = DatePicker(
+            datetime_frame,
+            font=FONT_SCHEME["body"],
+            background=COLOR_SCHEME["dark"],
+            foreground=COLOR_SCHEME["text"],
+            borderwidth=1,
+            relief=tk.FLAT
+        )
+        self.edit_due_date_cal.pack(side=tk.LEFT, padx=PADDING["medium"])
+
+        # Tasks may have no due date; saving keeps it that way unless unticked
+        self.edit_no_due_date = tk.BooleanVar()
+        tk.Checkbutton(datetime_frame, text="None", variable=self.edit_no_due_date,
+                       font=FONT_SCHEME["body"]).pack(side=tk.LEFT)
+
+        tk.Label(datetime_frame, text="Time:", font=FONT_SCHEME["body"]).pack(side=tk.LEFT)
+        self.edit_due_time_combo = ttk.Combobox(
+            datetime_frame,
+            values=TIME_OPTIONS,
+            font=FONT_SCHEME["body"],
+            state="readonly",
+            width=8
+        )
+        self.edit_due_time_combo.pack(side=tk.LEFT, padx=PADDING["medium"])
+
+        # Priority & Category
+        dropdown_frame = tk.Frame(self.edit_window)
+        dropdown_frame.pack(pady=PADDING["medium"])
+
+        tk.Label(dropdown_frame, text="Priority:", font=FONT_SCHEME["body"]).pack(side=tk.LEFT)
+        self.edit_priority_combo = ttk.Combobox(
+            dropdown_frame,
+            values=PRIORITIES,
+            font=FONT_SCHEME["body"],
+            state="readonly",
+            width=10
+        )
+        self.edit_priority_combo.pack(side=tk.LEFT, padx=PADDING["medium"])
+
+        tk.Label(dropdown_frame, text="Category:", font=FONT_SCHEME["body"]).pack(side=tk.LEFT)
+        self.edit_category_combo = ttk.Combobox(
+            dropdown_frame,
+            font=FONT_SCHEME["body"],
+            state="readonly",
+            width=10
+        )
+        self.edit_category_combo.pack(side=tk.LEFT, padx=PADDING["medium"])
+
+        # Recurrence
+        tk.Label(dropdown_frame, text="Recurrence:", font=FONT_SCHEME["body"]).pack(side=tk.LEFT)
+        self.edit_recurrence_combo = ttk.Combobox(
+            dropdown_frame,
+            values=list(PRESETS),
+            font=FONT_SCHEME["body"],
+            width=14
+        )
+        self.edit_recurrence_combo.pack(side=tk.LEFT, padx=PADDING["medium"])
+
+        # Notes
+        tk.Label(self.edit_window, text="Notes:", font=FONT_SCHEME["body"]).pack(pady=PADDING["medium"])
+        self.edit_notes_entry = tk.Text(self.edit_window, font=FONT_SCHEME["body"], width=40, height=4)
+        self.edit_notes_entry.pack(pady=PADDING["medium"])
+
+        # Save Button
+        save_btn = tk.Button(self.edit_window, text="💾 Save Changes", command=self.save_task_changes,
+                             bg=COLOR_SCHEME["success"], fg=COLOR_SCHEME["text"],
+                             font=FONT_SCHEME["button"], relief=tk.FLAT)
+        save_btn.pack(pady=PADDING["large"])
+
+    def open_edit_window(self, task_id, task):
+        if task is None:
+            return
+        if self.edit_window is None:
+            self.setup_edit_window()
+        self.edit_task_id = task_id
+
+        self.edit_task_entry.delete(0, tk.END)
+        self.edit_task_entry.insert(0, task.task)
+        self.edit_no_due_date.set(not task.due_date)
+        self.edit_due_date_cal.set_date(datetime.strptime(task.due_date, "%Y-%m-%d") if task.due_date
+                                        else datetime.now())
+        self.edit_due_time_combo.set(task.due_time or "")
+        self.edit_priority_combo.set(task.priority or "")
+        self.edit_category_combo["values"] = [category.name for category in self.categories]
+        self.edit_category_combo.set(task.category or "")
+        self.edit_recurrence_combo.set(task.recurrence or "None")
+        self.edit_notes_entry.delete("1.0", tk.END)
+        self.edit_notes_entry.insert("1.0", task.notes or "")
+
+        self.edit_window.deiconify()
+        self.edit_window.lift()
+        self.edit_task_entry.focus_set()
+
+    def close_edit_window(self):
+        self.edit_window.withdraw()
+        self.edit_task_id = None
+
+    def save_task_changes(self):
+        task_id = self.edit_task_id
+        recurrence = self.edit_recurrence_combo.get()
+        if task_id is None or not self.check_recurrence(recurrence):
+            return
+        due_date = None
+        if not self.edit_no_due_date.get():
+            due_date = self.edit_due_date_cal.get_date().strftime("%Y-%m-%d")
+        category = self.edit_category_combo.get()
+        self.db.submit(update_task, task_id, self.edit_task_entry.get(), due_date, self.edit_due_time_combo.get(),
+                       self.edit_priority_combo.get(), category, recurrence,
+                       self.edit_notes_entry.get("1.0", tk.END).strip(),
+                       callback=lambda _: self.task_changed(task_id, "Task updated successfully!"))
+        self.category_used(category)
+        self.close_edit_window()
 
     def delete_task(self):
-        selected = self.task_tree.selection()
-        if selected:
-            task_id = self.task_tree.item(selected[0], "values")[0]
-            if messagebox.askyesno("Confirm Delete", "Delete this task permanently?"):
-                cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-                conn.commit()
-                self.refresh_tasks()
-                messagebox.showinfo("Success", "Task deleted successfully!")
+        task_ids = self.selected_task_ids()
+        if task_ids:
+            question = "Delete this task permanently?" if len(task_ids) == 1 else \
+                f"Delete {len(task_ids):,} tasks permanently?"
+            if messagebox.askyesno("Confirm Delete", question):
+                self.db.submit(delete_tasks, task_ids,
+                               callback=lambda deleted: self.tasks_deleted(task_ids, deleted))
         else:
             messagebox.showwarning("Selection Error", "Please select a task to delete")
 
+    def tasks_deleted(self, task_ids, deleted):
+        # Deleted rows just leave the view; nothing needs re-reading
+        for task_id in task_ids:
+            self.remove_task_row(task_id)
+        self.reminders.start()
+        messagebox.showinfo("Success", tasks_message(deleted, "deleted"))
+
     def clear_all_tasks(self):
         if messagebox.askyesno("Confirm Clear", "This will delete ALL tasks!\nAre you sure?"):
-            cursor.execute("DELETE FROM tasks")
-            cursor.execute("DELETE FROM sqlite_sequence WHERE name='tasks'")
-            conn.commit()
-            self.refresh_tasks()
-            messagebox.showinfo("Success", "All tasks cleared!")
+            self.db.submit(clear_tasks, callback=lambda _: self.tasks_reloaded("All tasks cleared!"))
 
     def export_tasks(self):
         file_path = filedialog.asksaveasfilename(defaultextension=".csv", 
-                                                filetypes=[("CSV files", "*.csv")])
+                                                filetypes=[("CSV files", "*.csv"),
+                                                           ("Compressed CSV files", "*.csv.gz"),
+                                                           ("JSON Lines files", "*.jsonl")])
         if file_path:
-            cursor.execute("SELECT * FROM tasks")
-            tasks = cursor.fetchall()
-            with open(file_path, mode='w', newline='') as file:
-                writer = csv.writer(file)
-                writer.writerow(["ID", "Task", "Due Date", "Due Time", "Priority", "Category", "Completed", "Recurrence", "Notes"])
-                writer.writerows(tasks)
-            messagebox.showinfo("Success", "Tasks exported successfully!")
+            view_sql = ()
+            filtered = bool(self.view.conditions or self.view.params)
+            if filtered and messagebox.askyesno("Export Tasks", "Export only the tasks in the current filtered view?"):
+                view_sql = page_sql(self.view, limit=False)
+            self.status_label.config(text="Exporting...")
+            timer = Timer("ui", "export_tasks")
+            self.db.submit(timed("job", "export_tasks", export_tasks), file_path, *view_sql,
+                           callback=lambda exported: self.export_finished(exported, timer))
+
+    def export_finished(self, exported, timer=None):
+        if timer is not None:
+            timer.stop(exported)
+        self.status_label.config(text=f"Exported {exported:,} tasks")
+        messagebox.showinfo("Success", f"Exported {exported:,} tasks successfully!")
 
     def import_tasks(self):
         file_path = filedialog.askopenfilename(filetypes=[("CSV files", "*.csv")])
         if file_path:
-            with open(file_path, mode='r') as file:
-                reader = csv.reader(file)
-                next(reader)  # Skip header
-                for row in reader:
-                    cursor.execute("""
-                        INSERT INTO tasks (task, due_date, due_time, priority, category, completed, recurrence, notes)
-                        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
-                    """, (row[1], row[2], row[3], row[4], row[5], int(row[6]), row[7], row[8]))
-            conn.commit()
-            self.refresh_tasks()
-            messagebox.showinfo("Success", "Tasks imported successfully!")
+            self.import_btn.config(state=tk.DISABLED)
+            self.status_label.config(text="Importing...")
+            timer = Timer("ui", "import_tasks")
+            self.db.submit(timed("job", "import_csv", import_csv, rows=lambda result: result[0]), file_path,
+                           lambda *progress: self.db.post(self.show_import_progress, *progress),
+                           callback=lambda result: self.import_finished(result, timer), errback=self.import_failed)
+
+    def show_import_progress(self, imported, rejected, elapsed):
+        rate = imported / elapsed if elapsed else 0
+        self.status_label.config(
+            text=f"Importing... {imported:,} rows ({rate:,.0f} rows/s), {rejected:,} rejected")
+
+    def import_finished(self, result, timer=None):
+        imported, rejected, reject_path, elapsed = result
+        if timer is not None:
+            timer.stop(imported)
+        self.import_btn.config(state=tk.NORMAL)
+        rate = imported / elapsed if elapsed else 0
+        self.status_label.config(
+            text=f"Imported {imported:,} rows in {elapsed:.1f}s ({rate:,.0f} rows/s), {rejected:,} rejected")
+        message = f"Imported {imported:,} tasks."
+        if reject_path:
+            message += f"\n{rejected:,} rows were rejected; see {reject_path}"
+        self.tasks_reloaded(message)
+
+    def import_failed(self, exc):
+        self.import_btn.config(state=tk.NORMAL)
+        self.status_label.config(text="Import failed; nothing was imported")
+        self.show_database_error(exc)
+
+    def tasks_reloaded(self, message):
+        self.load_categories()
+        self.refresh_tasks()
+        self.reminders.start()
+        messagebox.showinfo("Success", message)
 
 # ================= Run Application =================
 if __name__ == "__main__":
+    started = time.perf_counter()
     root = tk.Tk()
     app = TodoApp(root)
-    root.mainloop()
-    conn.close()
\ No newline at end of file
+    root.after_idle(app.window_shown, started)
+    root.mainloop()
\ No newline at end of file
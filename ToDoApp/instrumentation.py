@@ -0,0 +1,235 @@
+import logging
+import os
+import sqlite3
+import threading
+import time
+from bisect import bisect_left
+from collections import OrderedDict, deque, namedtuple
+
+# Opt-in timing of SQL statements and UI operations, kept in memory as
+# rolling histograms. Nothing is recorded unless TODO_INSTRUMENT=1 is set
+# or recording is switched on from the debug panel (F12 in enahanced.py).
+# Statements slower than SLOW_QUERY_MS are logged with their query plan.
+
+enabled = os.environ.get("TODO_INSTRUMENT", "") not in ("", "0")
+SLOW_QUERY_MS = float(os.environ.get("TODO_SLOW_QUERY_MS", "100"))
+
+# Samples kept per series; percentiles describe only these
+ROLLING_SAMPLES = 1000
+# Upper bounds of the histogram buckets; the last bucket has no bound
+BUCKETS_MS = [0.1, 0.5, 1, 5, 10, 50, 100, 500, 1000, 5000]
+# Distinct statements tracked; the least recently seen is dropped first
+MAX_SERIES = 200
+SLOW_LOG_SIZE = 50
+
+logger = logging.getLogger("todo.instrumentation")
+
+SlowQuery = namedtuple("SlowQuery", ["recorded", "sql", "params", "elapsed_ms", "rows", "plan"])
+Summary = namedtuple("Summary", ["kind", "name", "count", "total_ms", "p50", "p90", "p99", "max", "mean_rows",
+                                 "buckets"])
+
+lock = threading.Lock()
+series = OrderedDict()  # (kind, name) -> RollingHistogram
+slow_queries = deque(maxlen=SLOW_LOG_SIZE)
+
+
+class RollingHistogram:
+    def __init__(self, size=ROLLING_SAMPLES):
+        self.samples = deque(maxlen=size)  # (elapsed_ms, rows)
+        self.count = 0
+        self.total_ms = 0.0
+
+    def add(self, elapsed_ms, rows):
+        self.samples.append((elapsed_ms, rows))
+        self.count += 1
+        self.total_ms += elapsed_ms
+
+    def summary(self, kind, name):
+        times = sorted(elapsed for elapsed, _ in self.samples)
+        rows = [count for _, count in self.samples if count is not None]
+        buckets = [0] * (len(BUCKETS_MS) + 1)
+        for elapsed in times:
+            buckets[bisect_left(BUCKETS_MS, elapsed)] += 1
+
+        def percentile(fraction):
+            return times[min(len(times) - 1, int(fraction * len(times)))]
+        return Summary(kind, name, self.count, self.total_ms, percentile(0.5), percentile(0.9), percentile(0.99),
+                       times[-1], sum(rows) / len(rows) if rows else None, buckets)
+
+
+def set_enabled(value):
+    global enabled
+    enabled = bool(value)
+
+
+def record(kind, name, elapsed_ms, rows=None):
+    with lock:
+        histogram = series.get((kind, name))
+        if histogram is None:
+            if len(series) >= MAX_SERIES:
+                series.popitem(last=False)
+            histogram = series[kind, name] = RollingHistogram()
+        else:
+            series.move_to_end((kind, name))
+        histogram.add(elapsed_ms, rows)
+
+
+def summaries():
+    # Every series, most total time first
+    with lock:
+        found = [histogram.summary(kind, name) for (kind, name), histogram in series.items()]
+    return sorted(found, key=lambda summary: summary.total_ms, reverse=True)
+
+
+def slow_query_log():
+    with lock:
+        return list(slow_queries)
+
+
+def reset():
+    with lock:
+        series.clear()
+        slow_queries.clear()
+
+
+def row_count(result):
+    # Rows reported for a timed call: lists count their items, ints are counts
+    if isinstance(result, int) and not isinstance(result, bool):
+        return result
+    if isinstance(result, list):
+        return len(result)
+    return None
+
+
+class Timer:
+    # Times an operation that may finish in a later callback:
+    #   timer = Timer("ui", "refresh_tasks") ... timer.stop(rows)
+    # started is a time.perf_counter() value if it began before now
+    def __init__(self, kind, name, started=None):
+        self.kind = kind
+        self.name = name
+        self.started = (started or time.perf_counter()) if enabled else None
+
+    def stop(self, rows=None):
+        if self.started is not None:
+            record(self.kind, self.name, (time.perf_counter() - self.started) * 1000, rows)
+            self.started = None
+
+
+def timed(kind, name, func, rows=row_count):
+    # Wraps func so each call is recorded along with rows(result)
+    def wrapper(*args, **kwargs):
+        timer = Timer(kind, name)
+        result = func(*args, **kwargs)
+        timer.stop(rows(result))
+        return result
+    return wrapper
+
+
+# ================= SQL =================
+def statement_name(sql):
+    return " ".join(sql.split())
+
+
+def query_plan(conn, sql, params):
+    # EXPLAIN QUERY PLAN as indented text, or None if it can't be had here
+    if not sql.lstrip().upper().startswith(("SELECT", "WITH")):
+        return None
+    try:
+        rows = sqlite3.Cursor(conn).execute("EXPLAIN QUERY PLAN " + sql, params).fetchall()
+    except sqlite3.Error:
+        return None
+    depth = {0: -1}
+    lines = []
+    for node, parent, _, detail in rows:
+        depth[node] = depth.get(parent, -1) + 1
+        lines.append("  " * depth[node] + detail)
+    return "\n".join(lines)
+
+
+def log_slow_query(conn, sql, params, elapsed_ms, rows):
+    plan = query_plan(conn, sql, params)
+    entry = SlowQuery(time.time(), statement_name(sql), params, elapsed_ms, rows, plan)
+    with lock:
+        slow_queries.append(entry)
+    logger.warning("slow query (%.1f ms, %s rows): %s\n%s", elapsed_ms, rows, entry.sql, plan or "")
+
+
+class InstrumentedCursor(sqlite3.Cursor):
+    # Times a statement from execute() until its last row has been fetched
+    # (or the cursor is reused, closed or dropped) and records it
+    sql = None
+
+    def execute(self, sql, params=()):
+        self.finish()
+        started = time.perf_counter()
+        super().execute(sql, params)
+        self.sql, self.params, self.rows = sql, params, 0
+        self.elapsed = time.perf_counter() - started
+        if self.description is None:
+            # Not a query: the statement has already run
+            self.rows = max(self.rowcount, 0)
+            self.finish()
+        return self
+
+    def executemany(self, sql, seq_of_params):
+        self.finish()
+        started = time.perf_counter()
+        super().executemany(sql, seq_of_params)
+        self.sql, self.params, self.rows = sql, None, max(self.rowcount, 0)
+        self.elapsed = time.perf_counter() - started
+        self.finish()
+        return self
+
+    def fetchone(self):
+        started = time.perf_counter()
+        row = super().fetchone()
+        self.fetched(started, 0 if row is None else 1, row is None)
+        return row
+
+    def fetchmany(self, size=None):
+        size = self.arraysize if size is None else size
+        started = time.perf_counter()
+        rows = super().fetchmany(size)
+        self.fetched(started, len(rows), len(rows) < size)
+        return rows
+
+    def fetchall(self):
+        started = time.perf_counter()
+        rows = super().fetchall()
+        self.fetched(started, len(rows), True)
+        return rows
+
+    def __next__(self):
+        started = time.perf_counter()
+        try:
+            row = super().__next__()
+        except StopIteration:
+            self.fetched(started, 0, True)
+            raise
+        self.fetched(started, 1, False)
+        return row
+
+    def fetched(self, started, rows, done):
+        if self.sql is None:
+            return
+        self.elapsed += time.perf_counter() - started
+        self.rows += rows
+        if done:
+            self.finish()
+
+    def finish(self):
+        if self.sql is None:
+            return
+        sql, self.sql = self.sql, None
+        elapsed_ms = self.elapsed * 1000
+        record("sql", statement_name(sql), elapsed_ms, self.rows)
+        if elapsed_ms >= SLOW_QUERY_MS:
+            log_slow_query(self.connection, sql, self.params, elapsed_ms, self.rows)
+
+    def close(self):
+        self.finish()
+        super().close()
+
+    def __del__(self):
+        self.finish()
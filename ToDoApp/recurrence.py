@@ -0,0 +1,124 @@
+import calendar
+from collections import namedtuple
+from datetime import date, timedelta
+
+# Recurrence rules for repeating tasks. A rule is stored in the recurrence
+# column either as one of the preset names or as a small subset of iCalendar
+# RRULE syntax, for example:
+#
+#   FREQ=WEEKLY;INTERVAL=2;BYDAY=MO,WE;UNTIL=2026-12-31
+#
+# FREQ is DAILY, WEEKLY, MONTHLY or YEARLY; INTERVAL defaults to 1; BYDAY
+# (weekly rules only) defaults to the weekday of the first task; UNTIL is the
+# last date an occurrence may fall on.
+
+WEEKDAYS = ["MO", "TU", "WE", "TH", "FR", "SA", "SU"]
+FREQUENCIES = ["DAILY", "WEEKLY", "MONTHLY", "YEARLY"]
+
+# Values offered by the recurrence combos
+PRESETS = {
+    "None": None,
+    "Daily": "FREQ=DAILY",
+    "Weekdays": "FREQ=WEEKLY;BYDAY=MO,TU,WE,TH,FR",
+    "Weekly": "FREQ=WEEKLY",
+    "Every 2 Weeks": "FREQ=WEEKLY;INTERVAL=2",
+    "Monthly": "FREQ=MONTHLY",
+    "Yearly": "FREQ=YEARLY"
+}
+
+Rule = namedtuple("Rule", ["freq", "interval", "weekdays", "until"])
+
+
+def parse_rule(text):
+    # Returns a Rule, None for tasks that don't repeat, or raises ValueError
+    text = (text or "").strip()
+    if text in PRESETS:
+        text = PRESETS[text]
+        if text is None:
+            return None
+    if not text:
+        return None
+
+    parts = {}
+    for part in text.upper().split(";"):
+        name, sep, value = part.partition("=")
+        if not sep or not value:
+            raise ValueError(f"invalid recurrence part {part!r}")
+        parts[name.strip()] = value.strip()
+
+    freq = parts.pop("FREQ", None)
+    if freq not in FREQUENCIES:
+        raise ValueError(f"recurrence needs FREQ set to one of {', '.join(FREQUENCIES)}")
+    interval = parts.pop("INTERVAL", "1")
+    if not interval.isdigit() or int(interval) < 1:
+        raise ValueError(f"invalid INTERVAL {interval!r}")
+    weekdays = ()
+    if "BYDAY" in parts:
+        if freq != "WEEKLY":
+            raise ValueError("BYDAY is only supported with FREQ=WEEKLY")
+        days = parts.pop("BYDAY").split(",")
+        if not all(day in WEEKDAYS for day in days):
+            raise ValueError(f"invalid BYDAY {','.join(days)!r}")
+        weekdays = tuple(sorted({WEEKDAYS.index(day) for day in days}))
+    until = None
+    if "UNTIL" in parts:
+        value = parts.pop("UNTIL").replace("-", "")[:8]
+        try:
+            until = date(int(value[:4]), int(value[4:6]), int(value[6:8]))
+        except ValueError:
+            raise ValueError(f"invalid UNTIL date {value!r}") from None
+    if parts:
+        raise ValueError(f"unsupported recurrence parts: {', '.join(parts)}")
+    return Rule(freq, int(interval), weekdays, until)
+
+
+def occurrences(rule, start, first=None, last=None):
+    # Lazily yields the dates of the series that begins on start, from first
+    # up to last (both inclusive). Without last or UNTIL the series never ends.
+    # Days that don't exist in a month or year (the 31st, 29 February) are
+    # skipped, as in iCalendar.
+    first = max(first or start, start)
+    if rule.until is not None:
+        last = min(last, rule.until) if last is not None else rule.until
+
+    if rule.freq == "DAILY":
+        step = (first - start).days
+        day = start + timedelta(days=-(-step // rule.interval) * rule.interval)
+        while last is None or day <= last:
+            yield day
+            day += timedelta(days=rule.interval)
+
+    elif rule.freq == "WEEKLY":
+        weekdays = rule.weekdays or (start.weekday(),)
+        week = start - timedelta(days=start.weekday())  # Monday of the first week
+        weeks = (first - week).days // 7
+        week += timedelta(weeks=weeks - weeks % rule.interval)
+        while True:
+            for weekday in weekdays:
+                day = week + timedelta(days=weekday)
+                if last is not None and day > last:
+                    return
+                if day >= first and day >= start:
+                    yield day
+            week += timedelta(weeks=rule.interval)
+
+    else:
+        months = 12 if rule.freq == "YEARLY" else 1
+        step = rule.interval * months
+        count = (first.year - start.year) * 12 + first.month - start.month
+        count -= count % step
+        while True:
+            year, month = divmod(start.month - 1 + count, 12)
+            year += start.year
+            if last is not None and date(year, month + 1, 1) > last:
+                return
+            if start.day <= calendar.monthrange(year, month + 1)[1]:
+                day = date(year, month + 1, start.day)
+                if day >= first and (last is None or day <= last):
+                    yield day
+            count += step
+
+
+def next_occurrence(rule, current):
+    # The occurrence after current, or None once the series has ended
+    return next(occurrences(rule, current, current + timedelta(days=1)), None)
@@ -0,0 +1,124 @@
+import heapq
+import time
+from datetime import date, datetime, timedelta
+from task_repository import get_task, due_tasks_between
+
+# Tasks without a due time are reminded at this time of day
+DEFAULT_REMINDER_TIME = "09:00"
+
+# Only reminders this far ahead are kept in memory; the next window is
+# loaded when the current one runs out
+REMINDER_HORIZON = timedelta(days=1)
+
+# Rebuild the heap once stale entries outnumber live ones by this much
+HEAP_SLACK = 64
+
+
+def reminder_time(task):
+    # Epoch seconds the task should be reminded at, or None
+    if task is None or task.completed or not task.due_date:
+        return None
+    try:
+        due = datetime.strptime(f"{task.due_date} {task.due_time or DEFAULT_REMINDER_TIME}", "%Y-%m-%d %H:%M")
+    except ValueError:
+        return None
+    return due.timestamp()
+
+
+def reminder_message(tasks):
+    lines = []
+    for task in tasks:
+        due = " ".join(part for part in (task.due_date, task.due_time) if part)
+        lines.append(f"{task.task} (due {due})")
+    return "\n".join(lines)
+
+
+# Keeps the upcoming reminders in a min-heap ordered by due time and arms a
+# single root.after timer for the earliest one. Changed tasks are pushed
+# again rather than searched for; entries that no longer match `pending`
+# are dropped when they reach the top. notify(tasks) runs on the Tk main
+# loop with every task that has come due.
+class ReminderScheduler:
+    def __init__(self, root, db, notify):
+        self.root = root
+        self.db = db
+        self.notify = notify
+        self.heap = []  # [(when, task_id), ...]
+        self.pending = {}  # task_id -> (when, task)
+        self.horizon = 0
+        self.timer_id = None
+        self.timer_at = None
+        self.generation = 0
+
+    def start(self):
+        # (Re)load the reminders due between now and now + REMINDER_HORIZON
+        self.generation += 1
+        generation = self.generation
+        # due_at is midnight for tasks without a time, so start the query at midnight
+        today = datetime.combine(date.today(), datetime.min.time()).timestamp()
+        horizon = (datetime.now() + REMINDER_HORIZON).timestamp()
+        self.db.submit(due_tasks_between, today, horizon,
+                       callback=lambda tasks: self.window_loaded(generation, horizon, tasks))
+
+    def window_loaded(self, generation, horizon, tasks):
+        if generation != self.generation:
+            return
+        self.heap = []
+        self.pending = {}
+        self.horizon = horizon
+        for task in tasks:
+            self.update(task.id, task, arm=False)
+        self.arm()
+
+    def refresh(self, task_id):
+        # Call after a task is added, edited, completed or deleted
+        self.db.submit(get_task, task_id, callback=lambda task: self.update(int(task_id), task))
+
+    def update(self, task_id, task, arm=True):
+        when = reminder_time(task)
+        if when is None or when < time.time() or when > self.horizon:
+            self.pending.pop(task_id, None)
+        else:
+            self.pending[task_id] = (when, task)
+            heapq.heappush(self.heap, (when, task_id))
+        if len(self.heap) > 2 * len(self.pending) + HEAP_SLACK:
+            self.heap = [(when, task_id) for task_id, (when, _) in self.pending.items()]
+            heapq.heapify(self.heap)
+        if arm:
+            self.arm()
+
+    def arm(self):
+        # Point the timer at the earliest live reminder, or the horizon
+        while self.heap and self.pending.get(self.heap[0][1], (None,))[0] != self.heap[0][0]:
+            heapq.heappop(self.heap)
+        target = min(self.heap[0][0], self.horizon) if self.heap else self.horizon
+        if target == self.timer_at:
+            return
+        self.stop()
+        delay = max(0, int((target - time.time()) * 1000) + 1)
+        self.timer_at = target
+        self.timer_id = self.root.after(delay, self.fire)
+
+    def fire(self):
+        self.timer_id = None
+        self.timer_at = None
+        now = time.time()
+        due = []
+        while self.heap and self.heap[0][0] <= now:
+            when, task_id = heapq.heappop(self.heap)
+            entry = self.pending.get(task_id)
+            if entry is not None and entry[0] == when:
+                del self.pending[task_id]
+                due.append(entry[1])
+        if now >= self.horizon:
+            self.start()
+        else:
+            self.arm()
+        if due:
+            self.notify(due)
+
+    def stop(self):
+        if self.timer_id is not None:
+            self.root.after_cancel(self.timer_id)
+        self.timer_id = None
+        self.timer_at = None
@@ -0,0 +1,939 @@
+import os
+import re
+import sqlite3
+import time
+from collections import namedtuple
+from contextlib import contextmanager
+from datetime import date, datetime, timedelta
+from urllib.parse import quote
+import instrumentation
+from instrumentation import InstrumentedCursor
+from recurrence import parse_rule, occurrences, next_occurrence
+
+# Shared storage layer for every To-Do front end. All SQL against todo.db
+# lives here as constant, parameterized statements so SQLite's statement
+# cache can reuse them. Functions take the connection as their first
+# argument, so they can be submitted straight to a DatabaseWorker.
+
+DATABASE = "todo.db"
+STATEMENT_CACHE_SIZE = 256
+
+# Several app instances and scripts share todo.db, so it runs in WAL mode:
+# readers never block and a writer waits up to BUSY_TIMEOUT seconds for the
+# lock instead of failing with "database is locked".
+BUSY_TIMEOUT = 10
+CACHE_SIZE_KB = 16 * 1024
+MMAP_SIZE = 256 * 1024 * 1024
+
+# How writes reach the disk, chosen with the TODO_DURABILITY environment variable:
+#   "normal"       - every write commits on its own (synchronous=NORMAL)
+#   "strict"       - every write commits on its own and is fsynced (synchronous=FULL)
+#   "write-behind" - writes made on a DatabaseWorker are grouped into short
+#                    transactions and committed together (see db_worker)
+DURABILITY = os.environ.get("TODO_DURABILITY", "normal")
+
+# Priority is stored as its rank (1 = Low ... 3 = High, NULL = none) and
+# category as an id into the categories table; reads turn both back into names
+PRIORITIES = ["Low", "Medium", "High"]
+PRIORITY_RANKS = {name.lower(): rank for rank, name in enumerate(PRIORITIES, 1)}
+PRIORITY_NAME_SQL = ("CASE priority " + " ".join(f"WHEN {rank} THEN '{name}'" for rank, name in enumerate(PRIORITIES, 1))
+                     + " END")
+CATEGORY_NAME_SQL = "(SELECT name FROM categories WHERE categories.id = tasks.category_id)"
+DEFAULT_CATEGORIES = ["Work", "Personal", "Shopping", "Other"]
+
+TASK_FIELDS = ["id", "task", "due_date", "due_time", "priority", "category", "completed", "recurrence", "notes"]
+TASK_COLUMNS = (f"id, task, due_date, due_time, {PRIORITY_NAME_SQL} AS priority, {CATEGORY_NAME_SQL} AS category, "
+                "completed, recurrence, notes")
+
+# A row of the tasks table
+Task = namedtuple("Task", TASK_FIELDS)
+Category = namedtuple("Category", ["id", "name"])
+
+# due_at is due_date + due_time (midnight if unset) as epoch seconds, reading
+# them as local time. Our inserts fill it in directly; triggers derive it for
+# any other writer and on updates, so it always matches the text columns.
+DUE_AT_SQL = "CAST(strftime('%s', {date} || ' ' || IFNULL(NULLIF({time}, ''), '00:00'), 'utc') AS INTEGER)"
+
+# Priority order used for sorting and its index
+PRIORITY_RANK_SQL = "IFNULL(priority, 0)"
+
+# Fields criteria can filter on (see compile_filter)
+FilterField = namedtuple("FilterField", ["expression", "encode", "placeholder", "weak"], defaults=["?", False])
+Criterion = namedtuple("Criterion", ["field", "op", "value", "negate"], defaults=[False])
+CompiledFilter = namedtuple("CompiledFilter", ["source", "conditions", "params", "ranked"])
+FILTER_OPS = {"=", "in", "range", "match"}
+# Joined in for a ranked text match; rows then carry match_rank (best first)
+FTS_SOURCE_SQL = ("tasks JOIN (SELECT rowid AS match_id, rank AS match_rank FROM tasks_fts"
+                  " WHERE tasks_fts MATCH ?) AS matches ON matches.match_id = tasks.id")
+FTS_CONDITION_SQL = "id IN (SELECT rowid FROM tasks_fts WHERE tasks_fts MATCH ?)"
+LIKE_CONDITION_SQL = "(task LIKE ? ESCAPE '\\' OR notes LIKE ? ESCAPE '\\')"
+
+# Named arguments for list_query, shared by the API and todoctl. Sort fields
+# are each backed by an index, so category sorts by category id: the order
+# categories were added in, as listed by list_categories. A trailing ! on a
+# filter (priority!=Low) negates it.
+SORT_FIELDS = {
+    "id": "id",
+    "task": "task",
+    "due_date": "IFNULL(due_at, 0)",
+    "due_time": "IFNULL(due_time, '')",
+    "priority": PRIORITY_RANK_SQL,
+    "category": "IFNULL(category_id, 0)",
+    "completed": "completed"
+}
+FILTER_ARGUMENTS = ["priority", "category", "due_date", "completed"]
+LIST_ARGUMENTS = ({*FILTER_ARGUMENTS, *(name + "!" for name in FILTER_ARGUMENTS)}
+                  | {"due_from", "due_to", "overdue", "q", "sort"})
+
+# Fields of a task as JSON, in the order add_tasks takes them. completed can
+# only be set when adding; complete_tasks changes it afterwards.
+ROW_FIELDS = ["task", "due_date", "due_time", "priority", "category", "completed", "recurrence", "notes"]
+ROW_POSITIONS = {field: index for index, field in enumerate(ROW_FIELDS)}
+PATCH_FIELDS = set(ROW_FIELDS) - {"completed"}
+
+# Export: rows fetched per batch, column names for JSON Lines and the CSV header
+EXPORT_BATCH_SIZE = 2000
+EXPORT_FIELDS = TASK_FIELDS
+EXPORT_HEADER = ["ID", "Task", "Due Date", "Due Time", "Priority", "Category", "Completed", "Recurrence", "Notes"]
+
+# CSV import: rows per executemany batch, and header names understood per column
+IMPORT_CHUNK_SIZE = 5000
+IMPORT_COLUMNS = {
+    "task": "task",
+    "due date": "due_date",
+    "due time": "due_time",
+    "time": "due_time",
+    "priority": "priority",
+    "category": "category",
+    "completed": "completed",
+    "status": "completed",
+    "recurrence": "recurrence",
+    "notes": "notes"
+}
+DATE_PATTERN = re.compile(r"\d{4}-\d{2}-\d{2}")
+TIME_PATTERN = re.compile(r"([01]\d|2[0-3]):[0-5]\d")
+COMPLETED_VALUES = {"1": 1, "0": 0, "": 0, "true": 1, "false": 0, "yes": 1, "no": 0,
+                    "complete": 1, "pending": 0}
+
+# ================= Statements =================
+TASKS_TABLE_SQL = """
+    CREATE TABLE IF NOT EXISTS {table} (
+        id INTEGER PRIMARY KEY AUTOINCREMENT,
+        task TEXT NOT NULL,
+        due_date TEXT,
+        due_time TEXT,
+        priority INTEGER,
+        category_id INTEGER REFERENCES categories (id),
+        completed INTEGER DEFAULT 0,
+        recurrence TEXT,
+        notes TEXT,
+        due_at INTEGER
+    )
+"""
+GET_TASK_SQL = f"SELECT {TASK_COLUMNS} FROM tasks WHERE id = ?"
+LIST_TASKS_SQL = f"SELECT {TASK_COLUMNS} FROM tasks ORDER BY id"
+INSERT_TASK_SQL = f"""
+    INSERT INTO tasks (task, due_date, due_time, priority, category_id, recurrence, notes, due_at)
+    VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, {DUE_AT_SQL.format(date="?2", time="?3")})
+"""
+INSERT_TASK_ROW_SQL = f"""
+    INSERT INTO tasks (task, due_date, due_time, priority, category_id, completed, recurrence, notes, due_at)
+    VALUES (?1, ?2, ?3, ?4, ?5, ?6, ?7, ?8, {DUE_AT_SQL.format(date="?2", time="?3")})
+"""
+UPDATE_TASK_SQL = """
+    UPDATE tasks
+    SET task = ?, due_date = ?, due_time = ?, priority = ?, category_id = ?, recurrence = ?, notes = ?
+    WHERE id = ?
+"""
+# Bulk edits work on the ids loaded into the selected_tasks temp table, so
+# each is one statement of the same shape however many tasks are selected
+SELECTED_TASKS_TABLE_SQL = "CREATE TEMP TABLE IF NOT EXISTS selected_tasks (id INTEGER PRIMARY KEY)"
+SELECT_TASK_SQL = "INSERT OR IGNORE INTO selected_tasks (id) VALUES (?)"
+SELECTED_REPEATING_SQL = f"""
+    SELECT {TASK_COLUMNS} FROM tasks
+    WHERE id IN (SELECT id FROM selected_tasks) AND completed = 0 AND IFNULL(recurrence, 'None') != 'None'
+    ORDER BY id
+"""
+COMPLETE_SELECTED_SQL = "UPDATE tasks SET completed = 1 WHERE id IN (SELECT id FROM selected_tasks) AND completed = 0"
+DELETE_SELECTED_SQL = "DELETE FROM tasks WHERE id IN (SELECT id FROM selected_tasks)"
+PRIORITIZE_SELECTED_SQL = "UPDATE tasks SET priority = ? WHERE id IN (SELECT id FROM selected_tasks)"
+RECATEGORIZE_SELECTED_SQL = "UPDATE tasks SET category_id = ? WHERE id IN (SELECT id FROM selected_tasks)"
+# Tasks without a due date keep none; the due_at trigger follows the new date
+SHIFT_SELECTED_SQL = """
+    UPDATE tasks SET due_date = date(due_date, ? || ' days')
+    WHERE id IN (SELECT id FROM selected_tasks) AND due_date IS NOT NULL
+"""
+# Pending tasks due in [start, end) epoch seconds, in due order; a range scan of idx_tasks_due_at
+DUE_TASKS_SQL = f"""
+    SELECT {TASK_COLUMNS} FROM tasks INDEXED BY idx_tasks_due_at
+    WHERE IFNULL(due_at, 0) >= ? AND IFNULL(due_at, 0) < ? AND completed = 0
+    ORDER BY IFNULL(due_at, 0), id
+"""
+# Pending repeating tasks. The planner would rather use idx_tasks_completed,
+# which scans every pending task, so the partial index is named explicitly.
+RECURRING_TASKS_SQL = f"""
+    SELECT {TASK_COLUMNS} FROM tasks INDEXED BY idx_tasks_next_occurrence
+    WHERE completed = 0 AND recurrence != 'None' AND due_date <= ?
+    ORDER BY due_date
+"""
+LIST_CATEGORIES_SQL = "SELECT id, name FROM categories ORDER BY id"
+# Categories at least one task belongs to; each check is one idx_tasks_category_id probe
+CATEGORIES_IN_USE_SQL = """
+    SELECT id, name FROM categories
+    WHERE EXISTS (SELECT 1 FROM tasks WHERE IFNULL(tasks.category_id, 0) = categories.id)
+    ORDER BY id
+"""
+INSERT_CATEGORY_SQL = "INSERT OR IGNORE INTO categories (name) VALUES (?)"
+GET_CATEGORY_ID_SQL = "SELECT id FROM categories WHERE name = ?"
+
+
+# ================= Connection & Schema =================
+class TaskConnection(sqlite3.Connection):
+    # With write_behind set, transaction() leaves its changes uncommitted
+    # in one open transaction until the owner calls commit()
+    write_behind = False
+
+    # While instrumentation is on, statements run on cursors that time them
+    def execute(self, sql, params=()):
+        if not instrumentation.enabled:
+            return super().execute(sql, params)
+        return self.cursor(InstrumentedCursor).execute(sql, params)
+
+    def executemany(self, sql, seq_of_params):
+        if not instrumentation.enabled:
+            return super().executemany(sql, seq_of_params)
+        return self.cursor(InstrumentedCursor).executemany(sql, seq_of_params)
+
+
+def connect(database=DATABASE, read_only=False, durability=DURABILITY, check_same_thread=True):
+    # read_only connections are for views that never write; the file must exist.
+    # check_same_thread=False is for pools that hand a connection between threads.
+    if read_only:
+        uri = "file:" + quote(os.path.abspath(database)) + "?mode=ro"
+        conn = sqlite3.connect(uri, uri=True, timeout=BUSY_TIMEOUT, cached_statements=STATEMENT_CACHE_SIZE,
+                               check_same_thread=check_same_thread, factory=TaskConnection)
+    else:
+        conn = sqlite3.connect(database, timeout=BUSY_TIMEOUT, cached_statements=STATEMENT_CACHE_SIZE,
+                               check_same_thread=check_same_thread, factory=TaskConnection)
+        conn.execute("PRAGMA journal_mode = WAL")
+        # In WAL mode NORMAL cannot corrupt the database; a power cut may only
+        # lose the last few commits. "strict" fsyncs every commit.
+        synchronous = "FULL" if durability == "strict" else "NORMAL"
+        conn.execute(f"PRAGMA synchronous = {synchronous}")
+    conn.execute(f"PRAGMA cache_size = -{CACHE_SIZE_KB}")
+    conn.execute(f"PRAGMA mmap_size = {MMAP_SIZE}")
+    conn.execute("PRAGMA foreign_keys = ON")
+    return conn
+
+
+def setup_database(conn):
+    # Runs as the first job on the database worker; returns whether FTS5 is
+    # usable. An up-to-date database costs one PRAGMA: migrations only run
+    # when its user_version is behind SCHEMA_VERSION.
+    if conn.execute("PRAGMA user_version").fetchone()[0] < SCHEMA_VERSION:
+        migrate(conn)
+    return conn.execute("SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts'").fetchone() is not None
+
+
+def migrate(conn):
+    # Holds the write lock throughout, so apps starting together migrate once
+    conn.execute("BEGIN IMMEDIATE")
+    try:
+        version = conn.execute("PRAGMA user_version").fetchone()[0]
+        cursor = conn.cursor()
+        for migration in MIGRATIONS[version:]:
+            migration(cursor)
+        conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+    except BaseException:
+        conn.rollback()
+        raise
+    conn.commit()
+
+
+def create_schema(cursor):
+    # Version 1: the schema as it stood when versioning began. Every step
+    # checks what is already there, so it also brings databases from before
+    # user_version was kept up to date.
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'categories'")
+    categories_exist = cursor.fetchone() is not None
+    cursor.execute("""
+    CREATE TABLE IF NOT EXISTS categories (
+        id INTEGER PRIMARY KEY,
+        name TEXT NOT NULL UNIQUE COLLATE NOCASE
+    )
+    """)
+    if not categories_exist:
+        cursor.executemany(INSERT_CATEGORY_SQL, ((name,) for name in DEFAULT_CATEGORIES))
+    cursor.execute(TASKS_TABLE_SQL.format(table="tasks"))
+
+    # Check for missing columns
+    cursor.execute("PRAGMA table_info(tasks)")
+    columns = [column[1] for column in cursor.fetchall()]
+    if 'due_date' not in columns:
+        cursor.execute("ALTER TABLE tasks ADD COLUMN due_date TEXT")
+    if 'due_time' not in columns:
+        cursor.execute("ALTER TABLE tasks ADD COLUMN due_time TEXT")
+    if 'priority' not in columns:
+        cursor.execute("ALTER TABLE tasks ADD COLUMN priority INTEGER")
+    if 'recurrence' not in columns:
+        cursor.execute("ALTER TABLE tasks ADD COLUMN recurrence TEXT")
+    if 'notes' not in columns:
+        cursor.execute("ALTER TABLE tasks ADD COLUMN notes TEXT")
+    if 'due_at' not in columns:
+        cursor.execute("ALTER TABLE tasks ADD COLUMN due_at INTEGER")
+        cursor.execute(f"UPDATE tasks SET due_at = {DUE_AT_SQL.format(date='due_date', time='due_time')} WHERE due_date IS NOT NULL")
+    converted = 'category_id' not in columns and 'category' in columns
+    if 'category_id' not in columns:
+        if converted:
+            convert_text_columns(cursor)
+        else:
+            cursor.execute("ALTER TABLE tasks ADD COLUMN category_id INTEGER REFERENCES categories (id)")
+
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_due_at_insert AFTER INSERT ON tasks
+    WHEN new.due_at IS NULL AND new.due_date IS NOT NULL BEGIN
+        UPDATE tasks SET due_at = {DUE_AT_SQL.format(date='new.due_date', time='new.due_time')} WHERE id = new.id;
+    END
+    """)
+    cursor.execute(f"""
+    CREATE TRIGGER IF NOT EXISTS tasks_due_at_update AFTER UPDATE OF due_date, due_time ON tasks BEGIN
+        UPDATE tasks SET due_at = {DUE_AT_SQL.format(date='new.due_date', time='new.due_time')} WHERE id = new.id;
+    END
+    """)
+
+    # Indexes for the sort orders used by the task views (see enahanced.SORT_EXPRESSIONS);
+    # the TEXT date indexes were replaced by ones on due_at
+    cursor.execute("DROP INDEX IF EXISTS idx_tasks_due")
+    cursor.execute("DROP INDEX IF EXISTS idx_tasks_priority_due")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_due_at ON tasks (IFNULL(due_at, 0), id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_time ON tasks (IFNULL(due_time, ''), id)")
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_tasks_priority_due_at ON tasks ({PRIORITY_RANK_SQL}, IFNULL(due_at, 0), id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_category_id ON tasks (IFNULL(category_id, 0), id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_completed ON tasks (completed, id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_task ON tasks (task, id)")
+    # The pending instance of a repeating task is its series' next occurrence
+    cursor.execute("""
+    CREATE INDEX IF NOT EXISTS idx_tasks_next_occurrence ON tasks (due_date)
+    WHERE completed = 0 AND recurrence != 'None'
+    """)
+
+    # Full-text index over task and notes, kept in sync with tasks by triggers
+    cursor.execute("SELECT 1 FROM sqlite_master WHERE name = 'tasks_fts'")
+    fts_exists = cursor.fetchone() is not None
+    try:
+        cursor.execute("""
+        CREATE VIRTUAL TABLE IF NOT EXISTS tasks_fts
+        USING fts5(task, notes, content='tasks', content_rowid='id')
+        """)
+        cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_insert AFTER INSERT ON tasks BEGIN
+            INSERT INTO tasks_fts (rowid, task, notes) VALUES (new.id, new.task, new.notes);
+        END
+        """)
+        cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_delete AFTER DELETE ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, task, notes) VALUES ('delete', old.id, old.task, old.notes);
+        END
+        """)
+        cursor.execute("""
+        CREATE TRIGGER IF NOT EXISTS tasks_fts_update AFTER UPDATE OF task, notes ON tasks BEGIN
+            INSERT INTO tasks_fts (tasks_fts, rowid, task, notes) VALUES ('delete', old.id, old.task, old.notes);
+            INSERT INTO tasks_fts (rowid, task, notes) VALUES (new.id, new.task, new.notes);
+        END
+        """)
+        # Converting may have added to notes, so its index is rebuilt too
+        if not fts_exists or converted:
+            cursor.execute("INSERT INTO tasks_fts (tasks_fts) VALUES ('rebuild')")
+    except sqlite3.OperationalError:
+        # SQLite built without FTS5: search falls back to LIKE
+        pass
+
+
+def convert_text_columns(cursor):
+    # Older tables keep priority and category as free text. SQLite can't
+    # change a column's type, so copy the rows into a new table, turning
+    # priorities into ranks and categories into ids. A priority that isn't
+    # one of PRIORITIES is kept as a "Priority: ..." line in the notes rather
+    # than lost. Ids are kept, so the full-text index stays valid.
+    cursor.execute("""
+    INSERT OR IGNORE INTO categories (name)
+    SELECT DISTINCT TRIM(category) FROM tasks WHERE TRIM(IFNULL(category, '')) != ''
+    """)
+    legacy_rank = ("CASE LOWER(TRIM(priority)) "
+                   + " ".join(f"WHEN '{name}' THEN {rank}" for name, rank in PRIORITY_RANKS.items()) + " END")
+    legacy_notes = f"""
+        CASE WHEN TRIM(IFNULL(priority, '')) = '' OR {legacy_rank} IS NOT NULL THEN notes
+             ELSE IFNULL(NULLIF(notes, '') || char(10), '') || 'Priority: ' || TRIM(priority) END"""
+    cursor.execute(TASKS_TABLE_SQL.format(table="tasks_new"))
+    cursor.execute(f"""
+    INSERT INTO tasks_new (id, task, due_date, due_time, priority, category_id, completed, recurrence, notes, due_at)
+    SELECT id, task, due_date, due_time, {legacy_rank},
+           (SELECT id FROM categories WHERE name = TRIM(tasks.category)),
+           completed, recurrence, {legacy_notes}, due_at
+    FROM tasks
+    """)
+    cursor.execute("DROP TABLE tasks")
+    cursor.execute("ALTER TABLE tasks_new RENAME TO tasks")
+
+
+def create_sort_indexes(cursor):
+    # Version 2: indexes for sorts the version 1 indexes can't serve. SQLite
+    # only walks an index backwards as a whole, so priority high-to-low then
+    # earliest due (the usual triage order) needs its own mixed-direction one.
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_tasks_priority_desc_due_at "
+                   f"ON tasks ({PRIORITY_RANK_SQL} DESC, IFNULL(due_at, 0), id)")
+    cursor.execute("CREATE INDEX IF NOT EXISTS idx_tasks_recurrence ON tasks (IFNULL(recurrence, ''), id)")
+
+
+def create_priority_index(cursor):
+    # Version 3: priority alone orders by rank then id, which the priority and
+    # due date indexes can only serve with a sort of every row
+    cursor.execute(f"CREATE INDEX IF NOT EXISTS idx_tasks_priority ON tasks ({PRIORITY_RANK_SQL}, id)")
+
+
+# MIGRATIONS[n] takes the schema from version n to n + 1 and is run at most
+# once per database; add a function here for every schema change
+MIGRATIONS = [create_schema, create_sort_indexes, create_priority_index]
+SCHEMA_VERSION = len(MIGRATIONS)
+
+
+# ================= Queries =================
+def get_task(conn, task_id):
+    row = conn.execute(GET_TASK_SQL, (task_id,)).fetchone()
+    return Task._make(row) if row else None
+
+
+def list_tasks(conn):
+    return [Task._make(row) for row in conn.execute(LIST_TASKS_SQL)]
+
+
+def find_tasks(conn, column, value):
+    # column is checked against FILTER_FIELDS, never spliced in from user input
+    compiled = compile_filter([Criterion(column, "=", value)])
+    query = f"SELECT {TASK_COLUMNS} FROM tasks WHERE {compiled.conditions[0]} ORDER BY id"
+    return [Task._make(row) for row in conn.execute(query, compiled.params)]
+
+
+def list_categories(conn, in_use=False):
+    # in_use=True leaves out categories no task belongs to
+    query = CATEGORIES_IN_USE_SQL if in_use else LIST_CATEGORIES_SQL
+    return [Category._make(row) for row in conn.execute(query)]
+
+
+def due_tasks_between(conn, start, end):
+    # start and end are epoch seconds
+    return [Task._make(row) for row in conn.execute(DUE_TASKS_SQL, (int(start), int(end)))]
+
+
+def occurrences_between(conn, first, last):
+    # (date, task) for every occurrence of a repeating task from first to
+    # last, worked out from the rules rather than stored
+    found = []
+    for row in conn.execute(RECURRING_TASKS_SQL, (last.isoformat(),)):
+        task = Task._make(row)
+        try:
+            rule = parse_rule(task.recurrence)
+            start = date.fromisoformat(task.due_date)
+        except (TypeError, ValueError):
+            continue
+        if rule is not None:
+            found.extend((day, task) for day in occurrences(rule, start, first, last))
+    found.sort(key=lambda occurrence: (occurrence[0], occurrence[1].id))
+    return found
+
+
+def keyset_condition(order, key, backwards):
+    # Rows strictly after (or before) key in order. The leading range term
+    # on the first expression lets SQLite seek into the index.
+    directions = {reverse != backwards for _, reverse in order}
+    exprs = [expr for expr, _ in order]
+    first_op = "<" if order[0][1] != backwards else ">"
+    condition = f"{exprs[0]} {first_op}= ? AND "
+    params = [key[0]]
+    if len(directions) == 1:
+        condition += f"({', '.join(exprs)}) {first_op} ({', '.join('?' * len(exprs))})"
+        return condition, params + list(key)
+    clauses = []
+    for i, (expr, reverse) in enumerate(order):
+        op = "<" if reverse != backwards else ">"
+        equals = [f"{prev} = ?" for prev in exprs[:i]]
+        clauses.append("(" + " AND ".join(equals + [f"{expr} {op} ?"]) + ")")
+        params.extend(key[:i + 1])
+    return condition + "(" + " OR ".join(clauses) + ")", params
+
+
+def fts_match_query(text):
+    # Every word must match, each as a quoted prefix so punctuation is literal
+    words = text.split()
+    return " ".join('"' + word.replace('"', '""') + '"*' for word in words)
+
+
+# ================= Filters =================
+# Structured criteria, Criterion(field, op, value, negate), compiled into a
+# WHERE clause. Fields come only from FILTER_FIELDS and every value is a
+# parameter, so the SQL text depends on which criteria are used but never on
+# their values, and SQLite's statement cache reuses one plan per combination.
+#   =      value                  in     list of values
+#   range  (low, high), half-open; None leaves that end open
+#   match  text in task or notes (field "text")
+# negate=True wraps the condition in NOT.
+def completed_value(value):
+    if isinstance(value, (bool, int)):
+        return int(bool(value))
+    try:
+        return COMPLETED_VALUES[str(value).strip().lower()]
+    except KeyError:
+        raise ValueError(f"invalid completed value {value!r}") from None
+
+
+def date_value(value):
+    value = str(value)
+    try:
+        if not DATE_PATTERN.fullmatch(value):
+            raise ValueError
+        date.fromisoformat(value)
+    except ValueError:
+        raise ValueError(f"invalid date {value!r}") from None
+    return value
+
+
+# weak fields match most rows, so their index is bypassed (+expression)
+# whenever another criterion is a range the planner can seek on instead
+FILTER_FIELDS = {
+    "id": FilterField("id", int),
+    "task": FilterField("task", str),
+    "due_date": FilterField("due_date", date_value),
+    "due_at": FilterField("IFNULL(due_at, 0)", int),
+    "due_time": FilterField("IFNULL(due_time, '')", str),
+    # due_at of tasks with a due date but no time, 0 for the rest
+    "date_only_due_at": FilterField("CASE WHEN IFNULL(due_time, '') = '' THEN IFNULL(due_at, 0) ELSE 0 END", int),
+    "priority": FilterField(PRIORITY_RANK_SQL, lambda value: priority_rank(value) or 0),
+    "category_id": FilterField("IFNULL(category_id, 0)", int),
+    # An unknown name matches no category (-1) rather than NULL, which would
+    # make "category is not X" drop every row
+    "category": FilterField("IFNULL(category_id, 0)", str, "IFNULL((SELECT id FROM categories WHERE name = ?), -1)"),
+    "completed": FilterField("completed", completed_value, weak=True),
+    "recurrence": FilterField("IFNULL(recurrence, 'None')", str)
+}
+
+
+def midnight(day):
+    # Epoch seconds of local midnight, which is how due_at stores dates
+    return int(datetime.combine(day, datetime.min.time()).timestamp())
+
+
+def date_window(first=None, last=None):
+    # Tasks due from first to last inclusive; either may be None. Tasks
+    # without a due date are never in a window.
+    low = midnight(first) if first is not None else 1
+    high = midnight(last + timedelta(days=1)) if last is not None else None
+    return Criterion("due_at", "range", (low, high))
+
+
+def overdue_criteria(now):
+    # Pending tasks that are past due at now (a datetime). A task with a date
+    # but no time is due all that day, so it is only overdue from the next
+    # midnight; reminders.py reminds about it at 09:00 on the day itself.
+    return [Criterion("due_at", "range", (1, int(now.timestamp()))),
+            Criterion("date_only_due_at", "range", (midnight(now.date()), None), negate=True),
+            Criterion("completed", "=", False)]
+
+
+def padded(values):
+    # Pad a list to a power of two by repeating its last value, so lists of
+    # similar length share a statement
+    size = 1 << (len(values) - 1).bit_length()
+    return values + values[-1:] * (size - len(values))
+
+
+def compile_filter(criteria, fts_enabled=False, ranked=False):
+    # Returns the FROM source, conditions and parameters. With ranked=True the
+    # first text match becomes a join on the FTS index (ranked is then set on
+    # the result) so callers can order by match_rank. Raises ValueError for an
+    # unknown field or operator, or a value the field can't take.
+    source = "tasks"
+    source_params = []
+    conditions = []
+    params = []
+    has_range = any(criterion.op == "range" for criterion in criteria)
+    for field, op, value, negate in criteria:
+        if op not in FILTER_OPS:
+            raise ValueError(f"unknown filter operator {op!r}")
+        if field == "text" and op == "match":
+            text = str(value or "").strip()
+            if not text:
+                continue
+            if not fts_enabled:
+                pattern = "%" + text.replace("\\", "\\\\").replace("%", "\\%").replace("_", "\\_") + "%"
+                condition, values = LIKE_CONDITION_SQL, [pattern, pattern]
+            elif ranked and not negate and source == "tasks":
+                source = FTS_SOURCE_SQL
+                source_params.append(fts_match_query(text))
+                continue
+            else:
+                condition, values = FTS_CONDITION_SQL, [fts_match_query(text)]
+        else:
+            spec = FILTER_FIELDS.get(field)
+            if spec is None or op == "match":
+                raise ValueError(f"Cannot filter tasks by {field!r}" if spec is None
+                                 else f"{field} does not support {op!r}")
+            expression = spec.expression
+            if spec.weak and has_range and op != "range":
+                expression = "+" + expression
+            if op == "=":
+                condition, values = f"{expression} = {spec.placeholder}", [spec.encode(value)]
+            elif op == "in":
+                values = padded([spec.encode(item) for item in value])
+                condition = f"{expression} IN ({', '.join([spec.placeholder] * len(values))})" if values else "0"
+            else:
+                low, high = value
+                parts, values = [], []
+                if low is not None:
+                    parts.append(f"{expression} >= {spec.placeholder}")
+                    values.append(spec.encode(low))
+                if high is not None:
+                    parts.append(f"{expression} < {spec.placeholder}")
+                    values.append(spec.encode(high))
+                if not parts:
+                    continue
+                condition = " AND ".join(parts)
+        # A condition on a NULL column (no due date, no notes) is NULL, not
+        # false, so negating it must still keep those rows
+        conditions.append(f"NOT IFNULL(({condition}), 0)" if negate else condition)
+        params.extend(values)
+    return CompiledFilter(source, conditions, source_params + params, source != "tasks")
+
+
+# ================= Queries and rows by name =================
+def date_argument(args, name):
+    try:
+        return date.fromisoformat(args[name])
+    except ValueError:
+        raise ValueError(f"{name} must be a date like 2026-01-31") from None
+
+
+def list_query(args, fts_enabled, best_match=False):
+    # SELECT, WHERE conditions, parameters and sort order for a dict of
+    # LIST_ARGUMENTS. Rows carry their sort key after the task columns, for
+    # keyset paging. Raises ValueError for arguments it can't use.
+    unknown = set(args) - LIST_ARGUMENTS
+    if unknown:
+        raise ValueError(f"unknown arguments: {', '.join(sorted(unknown))}")
+    # Criteria go in a fixed order, so the same arguments give the same SQL
+    criteria = []
+    for field in FILTER_ARGUMENTS:
+        for name, negate in ((field, False), (field + "!", True)):
+            if name in args:
+                values = args[name].split(",")
+                criteria.append(Criterion(field, "in", values, negate) if len(values) > 1
+                                else Criterion(field, "=", values[0], negate))
+    if "due_from" in args or "due_to" in args:
+        criteria.append(date_window(date_argument(args, "due_from") if "due_from" in args else None,
+                                    date_argument(args, "due_to") if "due_to" in args else None))
+    if "overdue" in args:
+        if args["overdue"] != "yes":
+            raise ValueError("overdue only takes yes")
+        criteria.extend(overdue_criteria(datetime.now()))
+    criteria.append(Criterion("text", "match", args.get("q", "")))
+    compiled = compile_filter(criteria, fts_enabled, ranked=True)
+
+    order = []
+    for field in filter(None, args.get("sort", "").split(",")):
+        reverse = field.startswith("-")
+        field = field.lstrip("-")
+        if field not in SORT_FIELDS:
+            raise ValueError(f"cannot sort by {field!r}")
+        order.append((SORT_FIELDS[field], reverse))
+    if compiled.ranked and (best_match or not order):
+        order.insert(0, ("match_rank", False))
+    order.append(("id", order[-1][1] if order else False))
+    query = f"SELECT {TASK_COLUMNS}, " + ", ".join(expr for expr, _ in order) + f" FROM {compiled.source}"
+    return query, compiled.conditions, list(compiled.params), order
+
+
+def task_json(row):
+    return dict(zip(TASK_FIELDS, row))
+
+
+def task_row(data, current=None, fields=ROW_FIELDS):
+    # Checks a JSON task and returns the row add_tasks takes; fields left out
+    # come from current. Raises ValueError.
+    if not isinstance(data, dict):
+        raise ValueError("expected a JSON object")
+    unknown = set(data) - set(fields)
+    if unknown:
+        raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+    values = current._asdict() if current is not None else {}
+    values.update(data)
+    text = []
+    for field in ROW_FIELDS:
+        value = values.get(field)
+        text.append("" if value is None else str(value))
+    row = parse_import_row(text, ROW_POSITIONS)
+    priority_rank(row[3])
+    parse_rule(row[6])
+    return row
+
+
+# ================= Writes =================
+@contextmanager
+def transaction(conn):
+    # All-or-nothing block of writes. Normally it commits on exit; on a
+    # write-behind connection it becomes a savepoint inside the open group
+    # transaction, so a failure only undoes this block's changes.
+    if not getattr(conn, "write_behind", False):
+        # Take the write lock up front: another writer then waits out
+        # BUSY_TIMEOUT here, where a read followed by a write inside a
+        # deferred transaction would fail at once with "database is locked"
+        if not conn.in_transaction:
+            conn.execute("BEGIN IMMEDIATE")
+        with conn:
+            yield conn
+        return
+    if not conn.in_transaction:
+        conn.execute("BEGIN IMMEDIATE")
+    conn.execute("SAVEPOINT task_write")
+    try:
+        yield conn
+    except BaseException:
+        conn.execute("ROLLBACK TO task_write")
+        conn.execute("RELEASE task_write")
+        raise
+    conn.execute("RELEASE task_write")
+
+
+def priority_rank(priority):
+    # "High" -> 3; an empty priority is stored as NULL
+    if not priority:
+        return None
+    rank = PRIORITY_RANKS.get(priority.strip().lower())
+    if rank is None:
+        raise ValueError(f"unknown priority {priority!r}")
+    return rank
+
+
+def category_id(conn, name):
+    # Id of the named category, adding it if it is new; empty means none.
+    # Call inside a transaction.
+    name = (name or "").strip()
+    if not name:
+        return None
+    conn.execute(INSERT_CATEGORY_SQL, (name,))
+    return conn.execute(GET_CATEGORY_ID_SQL, (name,)).fetchone()[0]
+
+
+def encode_row(conn, row, category_ids):
+    # (task, due_date, due_time, priority, category, completed, recurrence, notes)
+    # with priority and category names swapped for what is stored;
+    # category_ids caches name -> id across a batch
+    task, due_date, due_time, priority, category, completed, recurrence, notes = row
+    rank = priority_rank(priority)
+    if category not in category_ids:
+        category_ids[category] = category_id(conn, category)
+    return (task, due_date, due_time, rank, category_ids[category], completed, recurrence, notes)
+
+
+def add_category(conn, name):
+    with transaction(conn):
+        return category_id(conn, name)
+
+
+def add_task(conn, task, due_date=None, due_time=None, priority=None, category=None, recurrence=None, notes=None):
+    with transaction(conn):
+        cursor = conn.execute(INSERT_TASK_SQL, (task, due_date, due_time, priority_rank(priority),
+                                                category_id(conn, category), recurrence, notes))
+    return cursor.lastrowid
+
+
+def add_tasks(conn, rows):
+    # rows are (task, due_date, due_time, priority, category, completed, recurrence, notes)
+    category_ids = {}
+    with transaction(conn):
+        conn.executemany(INSERT_TASK_ROW_SQL, [encode_row(conn, row, category_ids) for row in rows])
+
+
+def update_task(conn, task_id, task, due_date, due_time, priority, category, recurrence, notes):
+    with transaction(conn):
+        conn.execute(UPDATE_TASK_SQL, (task, due_date, due_time, priority_rank(priority),
+                                       category_id(conn, category), recurrence, notes, task_id))
+
+
+def select_tasks(conn, task_ids):
+    # Load task_ids into the selected_tasks temp table; call inside a transaction
+    conn.execute(SELECTED_TASKS_TABLE_SQL)
+    conn.execute("DELETE FROM selected_tasks")
+    conn.executemany(SELECT_TASK_SQL, ((int(task_id),) for task_id in task_ids))
+
+
+def complete_tasks(conn, task_ids):
+    # Completing a repeating task adds its next occurrence as a new pending
+    # task; returns the ids of those new tasks
+    added = []
+    with transaction(conn):
+        select_tasks(conn, task_ids)
+        repeating = [Task._make(row) for row in conn.execute(SELECTED_REPEATING_SQL)]
+        conn.execute(COMPLETE_SELECTED_SQL)
+        for task in repeating:
+            next_due = next_task_date(task)
+            if next_due is not None:
+                cursor = conn.execute(INSERT_TASK_SQL, (task.task, next_due.isoformat(), task.due_time,
+                                                        priority_rank(task.priority), category_id(conn, task.category),
+                                                        task.recurrence, task.notes))
+                added.append(cursor.lastrowid)
+    return added
+
+
+def next_task_date(task):
+    # Rows from older versions or imports may carry rules we can't read;
+    # those simply don't repeat
+    try:
+        rule = parse_rule(task.recurrence)
+        current = date.fromisoformat(task.due_date)
+    except (TypeError, ValueError):
+        return None
+    return next_occurrence(rule, current) if rule is not None else None
+
+
+def delete_tasks(conn, task_ids):
+    # Returns how many tasks were deleted
+    with transaction(conn):
+        select_tasks(conn, task_ids)
+        return conn.execute(DELETE_SELECTED_SQL).rowcount
+
+
+def prioritize_tasks(conn, task_ids, priority):
+    # Returns how many tasks were changed
+    with transaction(conn):
+        select_tasks(conn, task_ids)
+        return conn.execute(PRIORITIZE_SELECTED_SQL, (priority_rank(priority),)).rowcount
+
+
+def recategorize_tasks(conn, task_ids, category):
+    # Returns how many tasks were changed
+    with transaction(conn):
+        select_tasks(conn, task_ids)
+        return conn.execute(RECATEGORIZE_SELECTED_SQL, (category_id(conn, category),)).rowcount
+
+
+def shift_due_dates(conn, task_ids, days):
+    # Moves due dates by a whole number of days; returns how many moved
+    with transaction(conn):
+        select_tasks(conn, task_ids)
+        return conn.execute(SHIFT_SELECTED_SQL, (f"{int(days):+d}",)).rowcount
+
+
+def clear_tasks(conn):
+    with transaction(conn):
+        conn.execute("DELETE FROM tasks")
+        conn.execute("DELETE FROM sqlite_sequence WHERE name='tasks'")
+
+
+# ================= Import & Export =================
+def export_tasks(conn, file_path, query=LIST_TASKS_SQL, params=()):
+    # Streams query results to CSV, gzip-compressed CSV or JSON Lines (picked
+    # by extension) in EXPORT_BATCH_SIZE batches, so memory use stays flat.
+    # Exports every task unless given a query; only the first
+    # len(EXPORT_FIELDS) columns of each row are written.
+    # Imported here rather than at startup, which never needs them
+    import csv
+    import gzip
+    import json
+    width = len(EXPORT_FIELDS)
+    cursor = conn.execute(query, params)
+    exported = 0
+    if file_path.lower().endswith(".jsonl"):
+        with open(file_path, mode='w', encoding='utf-8') as file:
+            while True:
+                rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+                if not rows:
+                    break
+                for row in rows:
+                    file.write(json.dumps(dict(zip(EXPORT_FIELDS, row[:width]))) + "\n")
+                exported += len(rows)
+        return exported
+
+    if file_path.lower().endswith(".gz"):
+        file = gzip.open(file_path, mode='wt', newline='', encoding='utf-8')
+    else:
+        file = open(file_path, mode='w', newline='', encoding='utf-8')
+    with file:
+        writer = csv.writer(file)
+        writer.writerow(EXPORT_HEADER)
+        while True:
+            rows = cursor.fetchmany(EXPORT_BATCH_SIZE)
+            if not rows:
+                break
+            writer.writerows(row[:width] for row in rows)
+            exported += len(rows)
+    return exported
+
+
+def parse_import_row(row, positions):
+    # Turn one CSV row into INSERT parameters, or raise ValueError
+    values = {}
+    for column, index in positions.items():
+        if index >= len(row):
+            raise ValueError(f"expected at least {index + 1} fields, got {len(row)}")
+        values[column] = row[index].strip()
+    if not values.get("task"):
+        raise ValueError("task is empty")
+    if values.get("due_date"):
+        if not DATE_PATTERN.fullmatch(values["due_date"]):
+            raise ValueError(f"invalid due date {values['due_date']!r}")
+        date.fromisoformat(values["due_date"])
+    if values.get("due_time") and not TIME_PATTERN.fullmatch(values["due_time"]):
+        raise ValueError(f"invalid due time {values['due_time']!r}")
+    completed = values.get("completed", "").lower()
+    if completed not in COMPLETED_VALUES:
+        raise ValueError(f"invalid completed value {values['completed']!r}")
+    return (values["task"], values.get("due_date") or None, values.get("due_time") or None,
+            values.get("priority") or None, values.get("category") or None, COMPLETED_VALUES[completed],
+            values.get("recurrence") or None, values.get("notes") or None)
+
+
+def import_csv(conn, file_path, report_progress):
+    # Streams the file in chunks inside a single transaction. Rows that fail
+    # validation go to <file>.rejects.csv instead of aborting the import.
+    import csv
+    started = time.perf_counter()
+    imported = 0
+    rejected = 0
+    reject_path = os.path.splitext(file_path)[0] + ".rejects.csv"
+    reject_file = None
+    try:
+        with open(file_path, mode='r', newline='', encoding='utf-8-sig') as file, transaction(conn):
+            reader = csv.reader(file)
+            header = next(reader, [])
+            positions = {}
+            for index, name in enumerate(header):
+                column = IMPORT_COLUMNS.get(name.strip().lower())
+                if column and column not in positions:
+                    positions[column] = index
+            if "task" not in positions:
+                raise ValueError("The CSV file has no Task column")
+
+            batch = []
+            category_ids = {}
+            for row in reader:
+                try:
+                    batch.append(encode_row(conn, parse_import_row(row, positions), category_ids))
+                except ValueError as exc:
+                    if reject_file is None:
+                        reject_file = open(reject_path, mode='w', newline='', encoding='utf-8')
+                        reject_writer = csv.writer(reject_file)
+                        reject_writer.writerow(["Line", "Error"] + header)
+                    reject_writer.writerow([reader.line_num, str(exc)] + row)
+                    rejected += 1
+                    continue
+                if len(batch) >= IMPORT_CHUNK_SIZE:
+                    conn.executemany(INSERT_TASK_ROW_SQL, batch)
+                    imported += len(batch)
+                    batch.clear()
+                    report_progress(imported, rejected, time.perf_counter() - started)
+            if batch:
+                conn.executemany(INSERT_TASK_ROW_SQL, batch)
+                imported += len(batch)
+    finally:
+        if reject_file is not None:
+            reject_file.close()
+    return imported, rejected, reject_path if rejected else None, time.perf_counter() - started
@@ -0,0 +1,25 @@
+import os
+import sys
+
+import pytest
+
+# The app modules live one directory up and import each other by name
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from task_repository import connect, setup_database, add_tasks  # noqa: E402
+
+
+@pytest.fixture
+def conn(tmp_path):
+    conn = connect(str(tmp_path / "todo.db"))
+    setup_database(conn)
+    yield conn
+    conn.close()
+
+
+@pytest.fixture
+def add(conn):
+    # add(row, ...) with rows as add_tasks takes them
+    def add(*rows):
+        add_tasks(conn, list(rows))
+    return add
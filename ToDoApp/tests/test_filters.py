@@ -0,0 +1,72 @@
+from datetime import date
+
+import pytest
+
+from task_repository import Criterion, compile_filter
+
+
+def matching(conn, criteria, fts_enabled=False):
+    compiled = compile_filter(criteria, fts_enabled)
+    query = f"SELECT task FROM {compiled.source}"
+    if compiled.conditions:
+        query += " WHERE " + " AND ".join(compiled.conditions)
+    return [row[0] for row in conn.execute(query + " ORDER BY id", compiled.params)]
+
+
+@pytest.fixture
+def tasks(add):
+    # (task, due_date, due_time, priority, category, completed, recurrence, notes)
+    add(("rent", "2026-01-01", None, "High", "Work", 0, None, "pay landlord"),
+        ("milk", None, None, None, None, 0, None, None),
+        ("call", "2026-02-01", "10:00", "Low", "Personal", 1, None, None))
+
+
+def test_negation_keeps_rows_with_null_fields(conn, tasks):
+    assert matching(conn, [Criterion("due_date", "=", date(2026, 1, 1), negate=True)]) == ["milk", "call"]
+    assert matching(conn, [Criterion("category", "=", "Work", negate=True)]) == ["milk", "call"]
+    assert matching(conn, [Criterion("priority", "in", ["High", "Low"], negate=True)]) == ["milk"]
+
+
+@pytest.mark.parametrize("fts_enabled", [False, True])
+def test_negated_text_match_keeps_tasks_without_notes(conn, tasks, fts_enabled):
+    assert matching(conn, [Criterion("text", "match", "landlord", negate=True)], fts_enabled) == ["milk", "call"]
+
+
+def test_unknown_category_name(conn, tasks):
+    assert matching(conn, [Criterion("category", "=", "Nope")]) == []
+    assert matching(conn, [Criterion("category", "=", "Nope", negate=True)]) == ["rent", "milk", "call"]
+
+
+def test_empty_in(conn, tasks):
+    assert matching(conn, [Criterion("priority", "in", [])]) == []
+    assert matching(conn, [Criterion("priority", "in", [], negate=True)]) == ["rent", "milk", "call"]
+
+
+def test_in_lists_are_padded_to_a_power_of_two(conn, tasks):
+    compiled = compile_filter([Criterion("id", "in", [1, 2, 3])])
+    assert compiled.conditions == ["id IN (?, ?, ?, ?)"]
+    assert compiled.params == [1, 2, 3, 3]
+
+
+def test_values_are_parameters(conn, tasks):
+    assert matching(conn, [Criterion("task", "=", "x'); DROP TABLE tasks; --")]) == []
+    assert conn.execute("SELECT COUNT(*) FROM tasks").fetchone()[0] == 3
+
+
+@pytest.mark.parametrize("criterion", [
+    Criterion("notes; DROP TABLE tasks", "=", 1),
+    Criterion("priority", "LIKE", "High"),
+    Criterion("priority", "match", "High"),
+    Criterion("due_date", "=", "2026-13-01"),
+    Criterion("completed", "=", "maybe"),
+])
+def test_bad_criteria_raise_value_error(criterion):
+    with pytest.raises(ValueError):
+        compile_filter([criterion])
+
+
+def test_range_and_weak_fields(conn, tasks):
+    compiled = compile_filter([Criterion("due_at", "range", (1, None)), Criterion("completed", "=", False)])
+    # completed is weak next to a range, so SQLite prefers the due_at index
+    assert compiled.conditions == ["IFNULL(due_at, 0) >= ?", "+completed = ?"]
+    assert matching(conn, [Criterion("due_at", "range", (1, None)), Criterion("completed", "=", False)]) == ["rent"]
@@ -0,0 +1,60 @@
+import random
+from itertools import permutations
+
+import pytest
+
+from task_repository import SORT_FIELDS, keyset_condition
+
+PAGE = 7
+
+
+@pytest.fixture
+def tasks(add):
+    # Few distinct values and plenty of NULLs, so sort keys tie often
+    rng = random.Random(7)
+    add(*[(f"task {rng.randrange(5)}", rng.choice([None, "2026-01-01", "2026-01-02", "2026-03-01"]),
+           rng.choice([None, "09:00", "17:30"]), rng.choice([None, "Low", "Medium", "High"]),
+           rng.choice([None, "Work", "Home"]), rng.randrange(2), None, None) for _ in range(60)])
+
+
+def ordered(conn, order, condition=None, params=(), backwards=False, limit=None):
+    query = "SELECT id, " + ", ".join(expr for expr, _ in order) + " FROM tasks"
+    if condition:
+        query += " WHERE " + condition
+    query += " ORDER BY " + ", ".join(f"{expr} {'DESC' if reverse != backwards else 'ASC'}"
+                                      for expr, reverse in order)
+    if limit:
+        query += f" LIMIT {limit}"
+    return conn.execute(query, list(params)).fetchall()
+
+
+def sort_orders():
+    # Every pair of sort fields in every combination of directions, ending
+    # with id in the direction of the last field as the views do
+    for first, second in permutations(SORT_FIELDS, 2):
+        for reverse_first in (False, True):
+            for reverse_second in (False, True):
+                yield [(SORT_FIELDS[first], reverse_first), (SORT_FIELDS[second], reverse_second),
+                       ("id", reverse_second)]
+
+
+@pytest.mark.parametrize("backwards", [False, True])
+def test_paging_visits_every_row_once(conn, tasks, backwards):
+    for order in sort_orders():
+        expected = [row[0] for row in ordered(conn, order)]
+        if backwards:
+            expected.reverse()
+        seen = []
+        page = ordered(conn, order, backwards=backwards, limit=PAGE)
+        while page:
+            seen.extend(row[0] for row in page)
+            condition, params = keyset_condition(order, page[-1][1:], backwards)
+            page = ordered(conn, order, condition, params, backwards, PAGE)
+        assert seen == expected, order
+
+
+def test_single_direction_uses_a_row_value(conn, tasks):
+    order = [("IFNULL(due_at, 0)", True), ("id", True)]
+    condition, params = keyset_condition(order, (5, 9), False)
+    assert condition == "IFNULL(due_at, 0) <= ? AND (IFNULL(due_at, 0), id) < (?, ?)"
+    assert params == [5, 5, 9]
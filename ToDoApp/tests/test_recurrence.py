@@ -0,0 +1,55 @@
+from datetime import date
+from itertools import islice
+
+import pytest
+
+from recurrence import Rule, next_occurrence, occurrences, parse_rule
+
+
+def test_presets():
+    assert parse_rule("None") is None
+    assert parse_rule("") is None
+    assert parse_rule("Weekdays") == Rule("WEEKLY", 1, (0, 1, 2, 3, 4), None)
+
+
+@pytest.mark.parametrize("text", ["FREQ=HOURLY", "FREQ=DAILY;INTERVAL=0", "FREQ=MONTHLY;BYDAY=MO",
+                                  "FREQ=WEEKLY;BYDAY=XX", "FREQ=DAILY;UNTIL=2026-02-30", "FREQ=DAILY;COUNT=3",
+                                  "FREQ"])
+def test_invalid_rules(text):
+    with pytest.raises(ValueError):
+        parse_rule(text)
+
+
+def test_monthly_on_the_31st_skips_short_months():
+    rule = parse_rule("Monthly")
+    assert list(occurrences(rule, date(2026, 1, 31), last=date(2026, 7, 31))) == [
+        date(2026, 1, 31), date(2026, 3, 31), date(2026, 5, 31), date(2026, 7, 31)]
+    assert next_occurrence(rule, date(2026, 1, 31)) == date(2026, 3, 31)
+
+
+def test_yearly_on_29_february():
+    assert next_occurrence(parse_rule("Yearly"), date(2024, 2, 29)) == date(2028, 2, 29)
+
+
+def test_until_is_inclusive():
+    rule = parse_rule("FREQ=DAILY;INTERVAL=2;UNTIL=2026-01-07")
+    assert list(occurrences(rule, date(2026, 1, 3))) == [date(2026, 1, 3), date(2026, 1, 5), date(2026, 1, 7)]
+    assert next_occurrence(rule, date(2026, 1, 7)) is None
+
+
+def test_interval_with_byday():
+    # Every other week on Monday and Wednesday, starting on a Wednesday
+    rule = parse_rule("FREQ=WEEKLY;INTERVAL=2;BYDAY=WE,MO")
+    start = date(2026, 1, 7)
+    assert list(islice(occurrences(rule, start), 5)) == [
+        date(2026, 1, 7), date(2026, 1, 19), date(2026, 1, 21), date(2026, 2, 2), date(2026, 2, 4)]
+    # Starting the window in an off week still lands on the series' weeks
+    assert list(islice(occurrences(rule, start, first=date(2026, 1, 26)), 2)) == [
+        date(2026, 2, 2), date(2026, 2, 4)]
+    assert next_occurrence(rule, date(2026, 1, 21)) == date(2026, 2, 2)
+
+
+def test_daily_interval_window():
+    rule = parse_rule("FREQ=DAILY;INTERVAL=3")
+    assert list(occurrences(rule, date(2026, 1, 1), date(2026, 1, 5), date(2026, 1, 12))) == [
+        date(2026, 1, 7), date(2026, 1, 10)]
@@ -1,26 +1,110 @@
+import json
+import os
 
-tasks = []
+PAGE_SIZE = 20          # Tasks shown at a time by view_tasks
+
+
+class Task:
+    __slots__ = ("id", "text")  # No per-task __dict__; large lists stay small
+
+    def __init__(self, task_id, text):
+        self.id = task_id
+        self.text = text
+
+
+# Which task ids exist, in order, as a Fenwick tree: adding or removing an
+# id and finding the k-th task are O(log n), and ids never shift.
+class OrderIndex:
+    def __init__(self):
+        self.tree = [0]         # 1-based; tree[i] counts ids in (i - lowbit(i), i]
+        self.present = [False]
+
+    def grow(self, task_id):
+        # Rebuild at double the size, in O(n)
+        size = max(task_id, 2 * (len(self.tree) - 1), 16)
+        self.present += [False] * (size + 1 - len(self.present))
+        self.tree = [int(flag) for flag in self.present]
+        for i in range(1, size + 1):
+            parent = i + (i & -i)
+            if parent <= size:
+                self.tree[parent] += self.tree[i]
+
+    def update(self, task_id, delta):
+        i = task_id
+        while i < len(self.tree):
+            self.tree[i] += delta
+            i += i & -i
+
+    def add(self, task_id):
+        if task_id >= len(self.tree):
+            self.grow(task_id)
+        if not self.present[task_id]:
+            self.present[task_id] = True
+            self.update(task_id, 1)
+
+    def remove(self, task_id):
+        if task_id < len(self.present) and self.present[task_id]:
+            self.present[task_id] = False
+            self.update(task_id, -1)
+
+    def select(self, k):
+        # Id of the k-th task (1-based)
+        position = 0
+        step = 1 << (len(self.tree) - 1).bit_length()
+        while step:
+            if position + step < len(self.tree) and self.tree[position + step] < k:
+                position += step
+                k -= self.tree[position]
+            step >>= 1
+        return position + 1
+
+
+tasks = {}              # Task id -> Task
+order = OrderIndex()    # The ids in tasks, oldest first
+next_id = 1             # Ids are never reused
+
+# Tasks are stored as a snapshot plus a journal of the changes made since.
+# Each add/complete/delete is appended to the journal and fsynced before it
+# is reported, so a crash loses nothing; on start the journal is replayed
+# over the snapshot. tasks.txt from older versions is read once.
+SNAPSHOT_FILE = "tasks.snapshot.json"
+JOURNAL_FILE = "tasks.journal"
+LEGACY_FILE = "tasks.txt"
+COMPACT_AFTER = 500     # Fold the journal into a new snapshot at this many records
+
+journal = None          # The journal, open for appending
+journal_records = 0     # Records in the journal
+last_seq = 0            # Sequence number of the last operation
 
 def view_tasks():
     if not tasks:   # Check if the list is empty
         print("No Tasks Found")
-    else:
-        print("Your tasks: ")
-        for i, task in enumerate(tasks, 1):    # Enumerate to show task numbers
-            print(f"{i }. {task}")
+        return
+    print("Your tasks: ")
+    shown = 0
+    while shown < len(tasks):               # One page at a time
+        for k in range(shown + 1, min(shown + PAGE_SIZE, len(tasks)) + 1):
+            task = tasks[order.select(k)]
+            print(f"{task.id}. {task.text}")
+        shown += PAGE_SIZE
+        if shown < len(tasks):
+            more = input(f"-- {shown} of {len(tasks)} shown. Press Enter for more, or q to stop: ")
+            if more.strip().lower() == "q":
+                break
 
 def add_task():
     task= input("Enter your task: ")
-    tasks.append(task)  # Add the task to the list
+    log_operation("add", id=next_id, task=task)  # Add the task to the list
     print(f"Task '{task}' added successfully.")     
             
 
 def complete_task():
     view_tasks()        # Show all tasks first
     try:
-        task_num =int(input("Enter the task number to mark as completed: "))
-        if 1<= task_num <= len(tasks):      # Check if the task number is valid
-            complete_task=tasks.pop(task_num-1)
+        task_id =int(input("Enter the task number to mark as completed: "))
+        if task_id in tasks:                # Check if the task number is valid
+            complete_task=tasks[task_id].text
+            log_operation("complete", id=task_id)
             print(f"Task '{complete_task}' marked as completed")
         else:
             print("Invalid task number. Please try again.")
@@ -30,33 +114,116 @@ def complete_task():
 def delete_task():
     view_tasks()    # Show all tasks first
     try:
-        task_num =int(input("Enter the task number to delete: "))
-        if 1<= task_num <= len(tasks):  # Check if the task number is valid
-            deleted_task= tasks.pop(task_num-1) # Remove the task
+        task_id =int(input("Enter the task number to delete: "))
+        if task_id in tasks:        # Check if the task number is valid
+            deleted_task= tasks[task_id].text
+            log_operation("delete", id=task_id)   # Remove the task
             print(f"Task {deleted_task} deleted.")
         else:
             print("Invalid task number. Please try again.")
     except ValueError:          # Handle invalid input (non-integer)
         print("Please enter a valid number.")
         
+def insert_task(task_id, text):
+    global next_id
+    tasks[task_id] = Task(task_id, text)
+    order.add(task_id)
+    next_id = max(next_id, task_id + 1)
+
+def remove_task(task_id):
+    del tasks[task_id]
+    order.remove(task_id)
+
+def apply_operation(record):
+    if record["op"] == "add":
+        insert_task(record["id"], record["task"])
+    else:                       # Completed tasks leave the list like deleted ones
+        remove_task(record["id"])
+
+def log_operation(op, **fields):
+    # Write the record to disk first, then change the list
+    global last_seq, journal_records
+    record = {"seq": last_seq + 1, "op": op, **fields}
+    journal.write((json.dumps(record) + "\n").encode("utf-8"))
+    journal.flush()
+    os.fsync(journal.fileno())  # Make sure it is really on disk
+    last_seq += 1
+    journal_records += 1
+    apply_operation(record)
+    if journal_records >= COMPACT_AFTER:
+        save_tasks()
+
 def save_tasks():
+    # Write a new snapshot and empty the journal. The snapshot is written to
+    # a temporary file and renamed over the old one, so there is always one
+    # complete snapshot; journal records it already holds are skipped by seq.
+    global journal_records
+    temp_file = SNAPSHOT_FILE + ".tmp"
+    with open(temp_file, "w") as file:
+        json.dump({"seq": last_seq, "next_id": next_id,
+                   "tasks": [[task.id, task.text] for task in tasks.values()]}, file)
+        file.flush()
+        os.fsync(file.fileno())
+    os.replace(temp_file, SNAPSHOT_FILE)
+    journal.truncate(0)
+    os.fsync(journal.fileno())
+    journal_records = 0
+
+def load_legacy_tasks():
     try:
-        with open("tasks.txt", "w") as file:    # Open the file in write mode   
-            for task in tasks:
-                file.write(task + "\n")         # Write each task to the file
-        print("Tasks saved successfully.")
-    except Exception as e:                      # Catch any unexpected errors
-        print(f"Error saving tasks: {e}")
+        with open(LEGACY_FILE, "r") as file:    # Open the file in read mode
+            for line in file:
+                insert_task(next_id, line.strip())  # Add each task to the list
+    except FileNotFoundError:
+        return False
+    return True
+
 def load_tasks():
+    global journal, journal_records, last_seq, next_id
     try:
-        with open("tasks.txt", "r") as file:    # Open the file in read mode
-            for line in file():
-                tasks.append(line.strip())      # Add each task to the list
-        print("Tasks loaded successfully.")
+        with open(SNAPSHOT_FILE, "r") as file:
+            snapshot = json.load(file)
+        for task_id, text in snapshot["tasks"]:
+            insert_task(task_id, text)
+        last_seq = snapshot["seq"]
+        next_id = snapshot["next_id"]
+        found = True
+    except FileNotFoundError:
+        found = os.path.exists(JOURNAL_FILE)
+        if not found:
+            found = load_legacy_tasks()
+    except (ValueError, KeyError) as e:         # Don't start and overwrite a damaged snapshot
+        print(f"Error loading tasks from {SNAPSHOT_FILE}: {e}")
+        raise SystemExit(1)
+
+    # Replay the journal. A crash mid-write can leave a partial last line;
+    # it is cut off so new records start on a fresh line.
+    good_size = 0
+    try:
+        with open(JOURNAL_FILE, "rb") as file:
+            for line in file:
+                if not line.endswith(b"\n"):
+                    break
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    break
+                good_size += len(line)
+                journal_records += 1
+                if record["seq"] > last_seq:    # Older records are in the snapshot already
+                    apply_operation(record)
+                    last_seq = record["seq"]
     except FileNotFoundError:
+        pass
+    journal = open(JOURNAL_FILE, "ab")
+    journal.truncate(good_size)
+
+    if found:
+        print("Tasks loaded successfully.")
+    else:
         print("No saved tasks found. Starting with an empty list.")
-    except Exception as e:                      # Catch any unexpected errors
-        print(f"Error saving tasks: {e}")
+    if journal_records >= COMPACT_AFTER or not os.path.exists(SNAPSHOT_FILE):
+        save_tasks()
 
 def show_menu():
     print("\nTo-Do App")
@@ -70,7 +237,6 @@ def main():
     load_tasks()  # Load tasks when the program starts
     while True:
         show_menu()
-        #save_tasks()    # Call the save_tasks function
 
         choice = input("Enter your choice: ")
         if choice == '1':
@@ -82,7 +248,8 @@ def main():
         elif choice == '4':
             delete_task()   # Call the delete_task function
         elif choice == '5':
-            save_tasks()    # Call the save_tasks function
+            save_tasks()    # Compact the journal so the next start is quick
+            journal.close()
             print("Exiting...")
             break
         else:
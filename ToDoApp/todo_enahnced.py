@@ -1,8 +1,12 @@
+import time
 import tkinter as tk
-from tkinter import ttk, messagebox
-from tkcalendar import DateEntry
-import sqlite3
-from datetime import datetime
+from tkinter import ttk, messagebox, simpledialog
+from date_picker import DatePicker
+from db_worker import DatabaseWorker
+from instrumentation import Timer
+from reminders import ReminderScheduler, reminder_message
+from task_repository import (PRIORITIES, PRIORITY_RANKS, setup_database, get_task, list_tasks, list_categories,
+                             add_category, add_task, complete_tasks, delete_tasks, clear_tasks)
 
 # ================= Constants & Styles =================
 COLOR_SCHEME = {
@@ -33,32 +37,6 @@ PADDING = {
 
 TIME_OPTIONS = [f"{h:02d}:{m:02d}" for h in range(24) for m in (0, 15, 30, 45)]
 
-# ================= Database Setup =================
-conn = sqlite3.connect("todo.db")
-cursor = conn.cursor()
-
-cursor.execute("""
-CREATE TABLE IF NOT EXISTS tasks (
-    id INTEGER PRIMARY KEY AUTOINCREMENT,
-    task TEXT NOT NULL,
-    due_date TEXT,
-    due_time TEXT,
-    priority TEXT,
-    category TEXT,
-    completed INTEGER DEFAULT 0
-)
-""")
-
-# Check for missing columns
-cursor.execute("PRAGMA table_info(tasks)")
-columns = [column[1] for column in cursor.fetchall()]
-if 'due_time' not in columns:
-    cursor.execute("ALTER TABLE tasks ADD COLUMN due_time TEXT")
-if 'category' not in columns:
-    cursor.execute("ALTER TABLE tasks ADD COLUMN category TEXT")
-
-conn.commit()
-
 # ================= Main Application =================
 class TodoApp:
     def __init__(self, root):
@@ -67,15 +45,56 @@ class TodoApp:
         self.root.geometry("800x600")
         self.sort_column = None
         self.sort_reverse = False
+
+        # All database work runs on a worker thread
+        self.db = DatabaseWorker(root, errback=self.show_database_error)
+        self.reminders = ReminderScheduler(root, self.db, self.show_reminders)
         
         # Create main frames
         self.input_frame = tk.Frame(root, bg=COLOR_SCHEME["primary"])
         self.view_frame = tk.Frame(root, bg=COLOR_SCHEME["primary"])
         
+        # The full view is built (and its tasks loaded) the first time it is shown
+        self.full_view_built = False
         self.setup_input_view()
-        self.setup_full_view()
         self.show_input_view()
-        self.refresh_tasks()
+        self.root.protocol("WM_DELETE_WINDOW", self.close)
+        self.db.submit(setup_database)
+        self.load_categories()
+        self.reminders.start()
+
+    def window_shown(self, started):
+        # Called once the main loop first goes idle; started is taken just
+        # before Tk starts, after the imports
+        Timer("ui", "time_to_first_window", started=started).stop()
+
+    def show_database_error(self, exc):
+        messagebox.showerror("Database Error", str(exc))
+
+    def load_categories(self):
+        self.db.submit(list_categories, callback=self.categories_loaded)
+
+    def categories_loaded(self, categories):
+        self.category_combo["values"] = [category.name for category in categories]
+
+    def new_category(self):
+        name = simpledialog.askstring("New Category", "Category name:", parent=self.root)
+        if name and name.strip():
+            self.db.submit(add_category, name, callback=lambda _: self.category_added(name.strip()))
+
+    def category_added(self, name):
+        self.load_categories()
+        self.category_combo.set(name)
+
+    def show_reminders(self, tasks):
+        self.root.bell()
+        messagebox.showinfo("Reminder", reminder_message(tasks))
+
+    def close(self):
+        # Let queued writes finish before the window goes away
+        self.reminders.stop()
+        self.db.close()
+        self.root.destroy()
 
     def setup_input_view(self):
         input_container = tk.Frame(self.input_frame, bg=COLOR_SCHEME["primary"])
@@ -103,9 +122,8 @@ class TodoApp:
         # Date Picker
         tk.Label(datetime_frame, text="Due Date:", bg=COLOR_SCHEME["primary"], 
                 fg=COLOR_SCHEME["text"], font=FONT_SCHEME["body"]).pack(side=tk.LEFT)
-        self.due_date_cal = DateEntry(
+        self.due_date_cal = DatePicker(
             datetime_frame,
-            date_pattern="yyyy-mm-dd",
             font=FONT_SCHEME["body"],
             background=COLOR_SCHEME["dark"],
             foreground=COLOR_SCHEME["text"],
@@ -136,7 +154,7 @@ class TodoApp:
                 fg=COLOR_SCHEME["text"], font=FONT_SCHEME["body"]).pack(side=tk.LEFT)
         self.priority_combo = ttk.Combobox(
             dropdown_frame,
-            values=["Low", "Medium", "High"],
+            values=PRIORITIES,
             font=FONT_SCHEME["body"],
             state="readonly",
             width=10
@@ -149,13 +167,16 @@ class TodoApp:
                 fg=COLOR_SCHEME["text"], font=FONT_SCHEME["body"]).pack(side=tk.LEFT)
         self.category_combo = ttk.Combobox(
             dropdown_frame,
-            values=["Work", "Personal", "Shopping", "Other"],
             font=FONT_SCHEME["body"],
             state="readonly",
             width=10
         )
         self.category_combo.set("Work")
-        self.category_combo.pack(side=tk.LEFT, padx=PADDING["medium"])
+        self.category_combo.pack(side=tk.LEFT)
+        new_category_btn = tk.Button(dropdown_frame, text="➕", command=self.new_category,
+                                     bg=COLOR_SCHEME["accent"], fg=COLOR_SCHEME["text"],
+                                     font=FONT_SCHEME["small"], relief=tk.FLAT)
+        new_category_btn.pack(side=tk.LEFT, padx=PADDING["medium"])
 
         # Buttons
         add_btn = tk.Button(input_container, text="➕ Add Task", command=self.add_task,
@@ -236,11 +257,16 @@ class TodoApp:
         self.input_frame.pack(fill=tk.BOTH, expand=True)
         self.root.geometry("800x600")
 
-    def show_full_view(self):
+    def show_full_view(self, refresh=True):
+        if not self.full_view_built:
+            self.setup_full_view()
+            self.full_view_built = True
+            refresh = True
         self.input_frame.pack_forget()
         self.view_frame.pack(fill=tk.BOTH, expand=True)
         self.root.geometry("1200x800")
-        self.refresh_tasks()
+        if refresh:
+            self.refresh_tasks()
 
     def add_task(self):
         task = self.task_entry.get()
@@ -250,53 +276,100 @@ class TodoApp:
         category = self.category_combo.get()
 
         if task:
-            cursor.execute("""
-                INSERT INTO tasks (task, due_date, due_time, priority, category)
-                VALUES (?, ?, ?, ?, ?)
-            """, (task, due_date, due_time, priority, category))
-            conn.commit()
+            self.db.submit(add_task, task, due_date, due_time, priority, category, callback=self.task_added)
             self.task_entry.delete(0, tk.END)
-            messagebox.showinfo("Success", "Task added successfully!")
-            self.show_full_view()
         else:
             messagebox.showwarning("Input Error", "Task description cannot be empty")
 
+    def task_added(self, task_id):
+        self.sync_task_row(task_id)
+        self.reminders.refresh(task_id)
+        messagebox.showinfo("Success", "Task added successfully!")
+        self.show_full_view(refresh=False)
+
+    def task_changed(self, task_id, message):
+        self.sync_task_row(task_id)
+        self.reminders.refresh(task_id)
+        messagebox.showinfo("Success", message)
+
+    def task_completed(self, task_id, next_ids):
+        # Repeating tasks come back as a new pending task for the next date
+        for next_id in next_ids:
+            self.sync_task_row(next_id)
+            self.reminders.refresh(next_id)
+        self.task_changed(task_id, "Task marked as complete!")
+
     def refresh_tasks(self):
+        self.db.submit(list_tasks, callback=self.show_tasks)
+
+    def show_tasks(self, tasks):
         for item in self.task_tree.get_children():
             self.task_tree.delete(item)
             
-        cursor.execute("SELECT id, task, due_date, due_time, priority, category, completed FROM tasks")
-        tasks = cursor.fetchall()
         for task in tasks:
-            status = "Complete" if task[6] else "Pending"
-            self.task_tree.insert("", "end", values=(
-                task[0], task[1], task[2], task[3], task[4], task[5], status),
-                tags=("complete" if task[6] else "pending"))
+            self.insert_task_row(task)
             
         self.task_tree.tag_configure("complete", background="#e8f5e9")
         self.task_tree.tag_configure("pending", background="#fffde7")
 
-    def treeview_sort_column(self, col):
+    def insert_task_row(self, task, index="end"):
+        status = "Complete" if task.completed else "Pending"
+        self.task_tree.insert("", index, iid=str(task.id), values=(
+            task.id, task.task, task.due_date, task.due_time, task.priority, task.category, status),
+            tags=("complete" if task.completed else "pending"))
+
+    def sync_task_row(self, task_id):
+        # Replace a single Treeview row instead of reloading the whole table
+        if not self.full_view_built:
+            return  # the whole table is loaded when the view is first shown
+        self.db.submit(get_task, task_id, callback=lambda task: self.apply_task_row(task_id, task))
+
+    def apply_task_row(self, task_id, task):
+        iid = str(task_id)
+        if self.task_tree.exists(iid):
+            self.task_tree.delete(iid)
+        if task is not None:
+            self.insert_task_row(task)
+            self.task_tree.move(iid, "", self.sorted_index(iid))
+
+    def sorted_index(self, iid):
+        # Binary search for the row's place under the current sort order
+        items = [item for item in self.task_tree.get_children() if item != iid]
+        if self.sort_column is None:
+            return len(items)
+        converter = self.sort_converter(self.sort_column)
+        key = converter(self.task_tree.set(iid, self.sort_column))
+        low, high = 0, len(items)
+        while low < high:
+            mid = (low + high) // 2
+            mid_key = converter(self.task_tree.set(items[mid], self.sort_column))
+            if (mid_key < key) if self.sort_reverse else (mid_key > key):
+                high = mid
+            else:
+                low = mid + 1
+        return low
+
+    def sort_converter(self, col):
         data_type_converter = {
             "ID": int,
-            "Due Date": lambda x: datetime.strptime(x, "%Y-%m-%d"),
-            "Time": lambda x: datetime.strptime(x, "%H:%M").time(),
-            "Priority": lambda x: {"Low": 1, "Medium": 2, "High": 3}[x],
+            # ISO dates and HH:MM times already sort correctly as text
+            "Due Date": str,
+            "Time": str,
+            "Priority": lambda x: PRIORITY_RANKS.get(x.lower(), 0),
             "Status": lambda x: {"Complete": 1, "Pending": 2}[x],
             "Task": str,
             "Category": str
         }
+        return data_type_converter.get(col, str)
 
+    def treeview_sort_column(self, col):
         if self.sort_column == col:
             self.sort_reverse = not self.sort_reverse
         else:
             self.sort_column = col
             self.sort_reverse = False
 
-        try:
-            converter = data_type_converter[col]
-        except KeyError:
-            converter = str
+        converter = self.sort_converter(col)
 
         items = [(converter(self.task_tree.set(k, col)), k) 
                 for k in self.task_tree.get_children('')]
@@ -318,10 +391,8 @@ class TodoApp:
         selected = self.task_tree.selection()
         if selected:
             task_id = self.task_tree.item(selected[0], "values")[0]
-            cursor.execute("UPDATE tasks SET completed = 1 WHERE id = ?", (task_id,))
-            conn.commit()
-            self.refresh_tasks()
-            messagebox.showinfo("Success", "Task marked as complete!")
+            self.db.submit(complete_tasks, [task_id],
+                           callback=lambda next_ids: self.task_completed(task_id, next_ids))
         else:
             messagebox.showwarning("Selection Error", "Please select a task first")
 
@@ -330,24 +401,25 @@ class TodoApp:
         if selected:
             task_id = self.task_tree.item(selected[0], "values")[0]
             if messagebox.askyesno("Confirm Delete", "Delete this task permanently?"):
-                cursor.execute("DELETE FROM tasks WHERE id = ?", (task_id,))
-                conn.commit()
-                self.refresh_tasks()
-                messagebox.showinfo("Success", "Task deleted successfully!")
+                self.db.submit(delete_tasks, [task_id],
+                               callback=lambda _: self.task_changed(task_id, "Task deleted successfully!"))
         else:
             messagebox.showwarning("Selection Error", "Please select a task to delete")
 
     def clear_all_tasks(self):
         if messagebox.askyesno("Confirm Clear", "This will delete ALL tasks!\nAre you sure?"):
-            cursor.execute("DELETE FROM tasks")
-            cursor.execute("DELETE FROM sqlite_sequence WHERE name='tasks'")
-            conn.commit()
+            self.db.submit(clear_tasks, callback=self.tasks_cleared)
+
+    def tasks_cleared(self, _):
+        if self.full_view_built:
             self.refresh_tasks()
-            messagebox.showinfo("Success", "All tasks cleared!")
+        self.reminders.start()
+        messagebox.showinfo("Success", "All tasks cleared!")
 
 # ================= Run Application =================
 if __name__ == "__main__":
+    started = time.perf_counter()
     root = tk.Tk()
     app = TodoApp(root)
-    root.mainloop()
-    conn.close()
\ No newline at end of file
+    root.after_idle(app.window_shown, started)
+    root.mainloop()
\ No newline at end of file
@@ -0,0 +1,316 @@
+import argparse
+import json
+import sqlite3
+import sys
+from datetime import date, datetime, timedelta
+from task_repository import (DATABASE, PRIORITIES, TASK_FIELDS, ROW_FIELDS, PATCH_FIELDS, INSERT_TASK_ROW_SQL, connect,
+                             setup_database, get_task, transaction, encode_row, add_tasks, update_task, complete_tasks,
+                             delete_tasks, export_tasks, import_csv, list_query, task_json, task_row)
+
+# Command-line access to todo.db for scripts and cron jobs; no Tk needed.
+# Output is JSON: one object per task (JSON Lines) for list and search, a
+# single object otherwise. Errors go to stderr as {"error": ...} with exit
+# status 1.
+#
+#   python todoctl.py add "Pay rent" --due-date 2026-02-01 --priority High
+#   python todoctl.py list --completed no --sort due_date,-priority --limit 20
+#   python todoctl.py list --priority High,Medium      (any of the values)
+#   python todoctl.py complete 12 15
+#   python todoctl.py delete 7
+#   python todoctl.py search "rent"
+#   python todoctl.py import tasks.csv
+#   python todoctl.py export tasks.jsonl
+#   python todoctl.py stats
+#   python todoctl.py batch < operations.jsonl
+#
+# batch reads one operation per line and applies them in order in a single
+# transaction, so either all of them happen or none do:
+#
+#   {"op": "add", "task": "Buy milk", "due_date": "2026-02-01", "category": "Shopping"}
+#   {"op": "update", "id": 12, "priority": "High"}
+#   {"op": "complete", "id": 12}
+#   {"op": "delete", "id": 7}
+
+BATCH_OPS = {"add", "update", "complete", "delete"}
+
+# Counts for stats; overdue and due today only count pending tasks. A task
+# with no due time is overdue from the end of its day, like the GUI filter.
+STATS_SQL = """
+    SELECT COUNT(*), IFNULL(SUM(completed = 0), 0), IFNULL(SUM(completed != 0), 0),
+           IFNULL(SUM(completed = 0 AND IFNULL(due_at, 0) > 0 AND due_at < ?
+                      AND (IFNULL(due_time, '') != '' OR due_at < ?)), 0),
+           IFNULL(SUM(completed = 0 AND due_at >= ? AND due_at < ?), 0)
+    FROM tasks
+"""
+PENDING_BY_PRIORITY_SQL = """
+    SELECT IFNULL(priority, 0), COUNT(*) FROM tasks WHERE completed = 0 GROUP BY IFNULL(priority, 0)
+"""
+PENDING_BY_CATEGORY_SQL = """
+    SELECT (SELECT name FROM categories WHERE categories.id = tasks.category_id), COUNT(*)
+    FROM tasks WHERE completed = 0 GROUP BY category_id
+"""
+
+
+class CommandError(Exception):
+    pass
+
+
+def write_json(value, file=sys.stdout):
+    file.write(json.dumps(value) + "\n")
+
+
+def open_database(path):
+    conn = connect(path)
+    fts_enabled = setup_database(conn)
+    return conn, fts_enabled
+
+
+# ================= Commands =================
+def cmd_add(conn, fts_enabled, args):
+    data = {field: getattr(args, field) for field in ROW_FIELDS if getattr(args, field, None) is not None}
+    try:
+        row = task_row(data)
+    except ValueError as exc:
+        raise CommandError(str(exc)) from None
+    with transaction(conn):
+        cursor = conn.execute(INSERT_TASK_ROW_SQL, encode_row(conn, row, {}))
+    write_json(task_json(get_task(conn, cursor.lastrowid)))
+
+
+def query_tasks(conn, fts_enabled, filters, limit, best_match=False):
+    # Streams the matching tasks as JSON Lines; returns how many were written
+    try:
+        query, conditions, params, order = list_query(filters, fts_enabled, best_match)
+    except ValueError as exc:
+        raise CommandError(str(exc)) from None
+    if conditions:
+        query += " WHERE " + " AND ".join(conditions)
+    query += " ORDER BY " + ", ".join(f"{expr} {'DESC' if reverse else 'ASC'}" for expr, reverse in order)
+    if limit is not None:
+        query += " LIMIT ?"
+        params.append(limit)
+    count = 0
+    cursor = conn.execute(query, params)
+    while True:
+        rows = cursor.fetchmany(1000)
+        if not rows:
+            break
+        sys.stdout.writelines(json.dumps(task_json(row[:len(TASK_FIELDS)])) + "\n" for row in rows)
+        count += len(rows)
+    return count
+
+
+def cmd_list(conn, fts_enabled, args):
+    filters = {name: getattr(args, name) for name in ("priority", "category", "completed", "due_date", "due_from",
+                                                      "due_to", "overdue", "sort") if getattr(args, name) is not None}
+    query_tasks(conn, fts_enabled, filters, args.limit)
+
+
+def cmd_search(conn, fts_enabled, args):
+    filters = {"q": args.query}
+    if args.sort:
+        filters["sort"] = args.sort
+    query_tasks(conn, fts_enabled, filters, args.limit, best_match=not args.sort)
+
+
+def cmd_complete(conn, fts_enabled, args):
+    # Repeating tasks come back as new pending tasks; their ids are listed
+    write_json({"next_ids": complete_tasks(conn, args.ids)})
+
+
+def cmd_delete(conn, fts_enabled, args):
+    write_json({"deleted": delete_tasks(conn, args.ids)})
+
+
+def cmd_import(conn, fts_enabled, args):
+    try:
+        imported, rejected, reject_path, elapsed = import_csv(conn, args.file, lambda *progress: None)
+    except (OSError, ValueError) as exc:
+        raise CommandError(str(exc)) from None
+    write_json({"imported": imported, "rejected": rejected, "reject_path": reject_path,
+                "seconds": round(elapsed, 3)})
+
+
+def cmd_export(conn, fts_enabled, args):
+    try:
+        exported = export_tasks(conn, args.file)
+    except OSError as exc:
+        raise CommandError(str(exc)) from None
+    write_json({"exported": exported, "file": args.file})
+
+
+def cmd_stats(conn, fts_enabled, args):
+    now = datetime.now()
+    today = datetime.combine(date.today(), datetime.min.time())
+    total, pending, completed, overdue, due_today = conn.execute(STATS_SQL, (
+        int(now.timestamp()), int(today.timestamp()), int(today.timestamp()),
+        int((today + timedelta(days=1)).timestamp()))).fetchone()
+    names = dict(enumerate(PRIORITIES, 1))
+    by_priority = {names.get(rank, "None"): count for rank, count in conn.execute(PENDING_BY_PRIORITY_SQL)}
+    by_category = {name or "None": count for name, count in conn.execute(PENDING_BY_CATEGORY_SQL)}
+    write_json({"total": total, "pending": pending, "completed": completed, "overdue": overdue,
+                "due_today": due_today, "pending_by_priority": by_priority, "pending_by_category": by_category})
+
+
+# ================= Batch =================
+def read_operations(lines):
+    # Parses and checks every line before anything is written. Returns
+    # [(line number, op, id, row or changes)]; raises CommandError.
+    operations = []
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            data = json.loads(line)
+            if not isinstance(data, dict):
+                raise ValueError("expected a JSON object")
+            data = dict(data)
+            op = data.pop("op", None)
+            if op not in BATCH_OPS:
+                raise ValueError(f"op must be one of {', '.join(sorted(BATCH_OPS))}")
+            task_id = None
+            if op != "add":
+                task_id = data.pop("id", None)
+                if not isinstance(task_id, int) or isinstance(task_id, bool):
+                    raise ValueError("id must be a task id")
+            if op == "add":
+                payload = task_row(data)
+            elif op == "update":
+                # The values are checked against the stored task when applied
+                unknown = set(data) - PATCH_FIELDS
+                if unknown:
+                    raise ValueError(f"unknown fields: {', '.join(sorted(unknown))}")
+                payload = data
+            else:
+                if data:
+                    raise ValueError(f"unknown fields: {', '.join(sorted(data))}")
+                payload = None
+        except ValueError as exc:
+            raise CommandError(f"line {number}: {exc}") from None
+        operations.append((number, op, task_id, payload))
+    return operations
+
+
+def apply_operations(conn, operations):
+    # Runs of the same op go to the database together: adds as one
+    # executemany, completes and deletes as one set-based statement each
+    result = {"added": 0, "updated": 0, "deleted": 0, "next_ids": []}
+    index = 0
+    while index < len(operations):
+        op = operations[index][1]
+        end = index + 1
+        if op != "update":  # updates are applied one at a time
+            while end < len(operations) and operations[end][1] == op:
+                end += 1
+        run = operations[index:end]
+        if op == "add":
+            add_tasks(conn, [payload for _, _, _, payload in run])
+            result["added"] += len(run)
+        elif op == "complete":
+            result["next_ids"].extend(complete_tasks(conn, [task_id for _, _, task_id, _ in run]))
+        elif op == "delete":
+            result["deleted"] += delete_tasks(conn, [task_id for _, _, task_id, _ in run])
+        else:
+            number, _, task_id, changes = run[0]
+            current = get_task(conn, task_id)
+            if current is None:
+                raise CommandError(f"line {number}: no task with id {task_id}")
+            try:
+                task, due_date, due_time, priority, category, _, recurrence, notes = task_row(
+                    changes, current, PATCH_FIELDS)
+            except ValueError as exc:
+                raise CommandError(f"line {number}: {exc}") from None
+            update_task(conn, task_id, task, due_date, due_time, priority, category, recurrence, notes)
+            result["updated"] += 1
+        index = end
+    return result
+
+
+def cmd_batch(conn, fts_enabled, args):
+    operations = read_operations(sys.stdin)
+    # transaction() nests as savepoints, so everything commits (or not) at the end
+    conn.write_behind = True
+    try:
+        result = apply_operations(conn, operations)
+        conn.commit()
+    except BaseException:
+        conn.rollback()
+        raise
+    write_json(result)
+
+
+# ================= Command line =================
+def build_parser():
+    parser = argparse.ArgumentParser(prog="todoctl", description="Scriptable access to the To-Do database")
+    parser.add_argument("--database", default=DATABASE)
+    commands = parser.add_subparsers(dest="command", required=True)
+
+    add = commands.add_parser("add", help="add a task")
+    add.add_argument("task")
+    add.add_argument("--due-date", dest="due_date", help="YYYY-MM-DD")
+    add.add_argument("--due-time", dest="due_time", help="HH:MM")
+    add.add_argument("--priority", choices=PRIORITIES)
+    add.add_argument("--category")
+    add.add_argument("--recurrence", help="a preset such as Weekly, or an RRULE")
+    add.add_argument("--notes")
+    add.set_defaults(func=cmd_add)
+
+    listing = commands.add_parser("list", help="list tasks as JSON Lines")
+    listing.add_argument("--priority")
+    listing.add_argument("--category")
+    listing.add_argument("--completed", help="yes or no")
+    listing.add_argument("--due-date", dest="due_date", help="YYYY-MM-DD")
+    listing.add_argument("--due-from", dest="due_from", help="YYYY-MM-DD")
+    listing.add_argument("--due-to", dest="due_to", help="YYYY-MM-DD")
+    listing.add_argument("--overdue", action="store_const", const="yes", help="only pending tasks past due")
+    listing.add_argument("--sort", help="fields, - for descending, e.g. due_date,-priority (or --sort=-priority)")
+    listing.add_argument("--limit", type=int)
+    listing.set_defaults(func=cmd_list)
+
+    search = commands.add_parser("search", help="search tasks and notes, best match first")
+    search.add_argument("query")
+    search.add_argument("--sort")
+    search.add_argument("--limit", type=int)
+    search.set_defaults(func=cmd_search)
+
+    complete = commands.add_parser("complete", help="mark tasks as complete")
+    complete.add_argument("ids", type=int, nargs="+")
+    complete.set_defaults(func=cmd_complete)
+
+    delete = commands.add_parser("delete", help="delete tasks")
+    delete.add_argument("ids", type=int, nargs="+")
+    delete.set_defaults(func=cmd_delete)
+
+    import_ = commands.add_parser("import", help="import a CSV file in one transaction")
+    import_.add_argument("file")
+    import_.set_defaults(func=cmd_import)
+
+    export = commands.add_parser("export", help="export to .csv, .csv.gz or .jsonl")
+    export.add_argument("file")
+    export.set_defaults(func=cmd_export)
+
+    stats = commands.add_parser("stats", help="task counts")
+    stats.set_defaults(func=cmd_stats)
+
+    batch = commands.add_parser("batch", help="apply JSON Lines operations from stdin in one transaction")
+    batch.set_defaults(func=cmd_batch)
+    return parser
+
+
+def main(argv=None):
+    args = build_parser().parse_args(argv)
+    conn = None
+    try:
+        conn, fts_enabled = open_database(args.database)
+        args.func(conn, fts_enabled, args)
+    except (CommandError, sqlite3.Error) as exc:
+        write_json({"error": str(exc)}, sys.stderr)
+        return 1
+    finally:
+        if conn is not None:
+            conn.close()
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())